@@ -1,51 +1,86 @@
-import dash
-from dash import html, dcc, Output, Input, State, callback
-
-
-# Initialize the app
-app = dash.Dash(__name__, use_pages=True)
-server = app.server
-
-navbar = html.Nav([
-    dcc.Store(id='menu-state', data=False),
-
-    html.Div([
-        html.P("AQI Analysis", className="brand"),
-        html.Div("☰", id="menu-toggle", className="menu-icon", n_clicks=0),
-    ], className="navbar-header"),
-
-    html.Ul([
-        html.Li(dcc.Link("Main", href="/")),
-        html.Li(dcc.Link("Objectives", href="/objectives")),
-        html.Li(dcc.Link("Major Findings", href="/major-findings")),
-        html.Li(dcc.Link("Analytical Methods", href="/analytical-methods")),
-        html.Li(dcc.Link("Predict Future PM 2.5 AQI", href="/predict-future-aqi")),
-        html.Li(dcc.Link("Predict AQI at Unsampled Locations", href="/predict-at-unsampled-locations"))
-    ], id="nav-links", className="navlinks")
-], className="navbar")
-
-
-app.layout = html.Div([
-    navbar,
-    dash.page_container
-])
-
-
-@callback(
-    Output('menu-state', 'data'),
-    Input('menu-toggle', 'n_clicks'),
-    State('menu-state', 'data'),
-    prevent_initial_call=True
-)
-def toggle_menu_state(n_clicks, current_state):
-    return not current_state
-
-@callback(
-    Output('nav-links', 'className'),
-    Input('menu-state', 'data')
-)
-def update_nav_class(open_state):
-    return "navlinks show" if open_state else "navlinks"
+import os
+from utils.profiling import profiler
+
+
+def create_app():
+    """Starts the data prefetch, imports the pages and builds the app."""
+    # STARTUP_PROFILE=1 records the cost of every import, download and parse from here on
+    profiler.install()
+
+    import dash
+    from dash import html, dcc, Output, Input, State
+    from utils.metrics import callback_metrics
+    from utils.startup import startup
+
+    # Pages load their data on first render; STARTUP_PREFETCH=1 (the default) also starts
+    # fetching all of it concurrently in the background so the first visit rarely waits
+    if os.environ.get("STARTUP_PREFETCH", "1") == "1":
+        startup.start()
+        startup.report_when_done(then=lambda: profiler.dump("prefetch"))
+
+    # Initialize the app; page layouts are functions that load data, so callbacks are not
+    # validated against every page's layout up front
+    app = dash.Dash(__name__, use_pages=True, suppress_callback_exceptions=True)
+    server = app.server
+    if os.environ.get("STARTUP_PROFILE_ROUTE", "0") == "1":
+        profiler.register_route(server)
+
+    # Prometheus-format callback latency, response size, exception and cache metrics
+    callback_metrics.register_route(server)
+
+    navbar = html.Nav([
+        dcc.Store(id='menu-state', data=False),
+
+        html.Div([
+            html.P("AQI Analysis", className="brand"),
+            html.Div("☰", id="menu-toggle", className="menu-icon", n_clicks=0),
+        ], className="navbar-header"),
+
+        html.Ul([
+            html.Li(dcc.Link("Main", href="/")),
+            html.Li(dcc.Link("Objectives", href="/objectives")),
+            html.Li(dcc.Link("Major Findings", href="/major-findings")),
+            html.Li(dcc.Link("Analytical Methods", href="/analytical-methods")),
+            html.Li(dcc.Link("Predict Future PM 2.5 AQI", href="/predict-future-aqi")),
+            html.Li(dcc.Link("Predict AQI at Unsampled Locations", href="/predict-at-unsampled-locations"))
+        ], id="nav-links", className="navlinks")
+    ], className="navbar")
+
+
+    app.layout = html.Div([
+        navbar,
+        # Spinner while a page's layout waits for its data
+        dcc.Loading(dash.page_container, type="circle", target_components={"_pages_content": "children"})
+    ])
+
+
+    @app.callback(
+        Output('menu-state', 'data'),
+        Input('menu-toggle', 'n_clicks'),
+        State('menu-state', 'data'),
+        prevent_initial_call=True
+    )
+    @callback_metrics.instrument()
+    def toggle_menu_state(n_clicks, current_state):
+        return not current_state
+
+    @app.callback(
+        Output('nav-links', 'className'),
+        Input('menu-state', 'data')
+    )
+    @callback_metrics.instrument()
+    def update_nav_class(open_state):
+        return "navlinks show" if open_state else "navlinks"
+
+    profiler.dump("boot")
+    return app
+
+
+# The Kriging process pool (KRIGING_WORKERS > 1) spawns workers that re-import this
+# script as __mp_main__ under `python app.py`; they only need utils, not a booted app
+if __name__ != "__mp_main__":
+    app = create_app()
+    server = app.server
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,35 @@
+"""Vectorized AQI classification against the original per-value scan, plus PM 2.5 spot checks.
+
+Run from the repository root:  python -m benchmarks.aqi_lookup
+"""
+import time
+
+import numpy as np
+
+from utils.aqi import aqi_color, pm25_to_aqi
+from benchmarks.forecast_figure import get_aqi_color
+
+
+def main(n=1_000_000):
+    values = np.random.default_rng(0).uniform(0, 520, n)
+    # The original scan puts exact bounds (50, 100, ...) in the upper band, EPA in the lower one
+    off_bounds = values[np.round(values) != values]
+
+    start = time.perf_counter()
+    expected = [get_aqi_color(v) for v in off_bounds]
+    scan_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    result = aqi_color(off_bounds)
+    vector_seconds = time.perf_counter() - start
+    assert (result == np.array(expected)).all()
+    print(f"{len(off_bounds)} values: scan {scan_seconds:.2f} s, vectorized {vector_seconds * 1000:.1f} ms")
+
+    # EPA examples: breakpoint edges and a value inside a band
+    concentrations = np.array([0.0, 9.0, 9.1, 12.0, 35.4, 35.5, 55.4, 125.5, 325.4, np.nan])
+    expected_aqi = np.array([0, 50, 51, 56, 100, 101, 150, 201, 500, np.nan])
+    np.testing.assert_array_equal(pm25_to_aqi(concentrations), expected_aqi)
+    print("PM 2.5 to AQI matches the EPA breakpoints")
+
+
+if __name__ == "__main__":
+    main()
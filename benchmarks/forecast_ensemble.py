@@ -0,0 +1,57 @@
+"""Cost of a batched forecast ensemble against a single rollout and per-sample loops.
+
+Runs offline on a small untrained LSTM with the production layer stack:
+
+    python -m benchmarks.forecast_ensemble
+
+or on the LSTM artifacts from the munkh_models_lstm bucket on local disk:
+
+    python -m benchmarks.forecast_ensemble rigorous_fresno_pm25_lstm_model.h5 \\
+        rigorous_fresno_pm25_last_60_scaled.npy rigorous_fresno_pm25_scaler.pkl [days] [samples]
+"""
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.forecast_inference import load_artifacts
+from utils.forecast import CompiledModel, predict_future, predict_future_ensemble
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main(model_path=None, window_path=None, scaler_path=None, days=123, samples=100):
+    days, samples = int(days), int(samples)
+    model, window, scaler = load_artifacts(model_path, window_path, scaler_path)
+    model = CompiledModel(model)
+    predict_future(model, window, 1, scaler)  # warm up (tracing)
+    predict_future_ensemble(model, window, 1, scaler, n_samples=samples)
+
+    point, single_seconds = timed(predict_future, model, window, days, scaler)
+    print(f"single rollout:        {single_seconds:7.2f} s")
+
+    # A few unbatched samples are enough to extrapolate the per-sample loop
+    looped = min(samples, 5)
+    _, loop_seconds = timed(lambda: [predict_future_ensemble(model, window, days, scaler, n_samples=1, seed=s)
+                                     for s in range(looped)])
+    print(f"{samples} looped samples: {loop_seconds / looped * samples:7.2f} s (extrapolated from {looped})")
+
+    for method in ("dropout", "noise"):
+        band, seconds = timed(predict_future_ensemble, model, window, days, scaler,
+                              n_samples=samples, method=method)
+        width = band[2] - band[0]
+        assert np.all(band[0] <= band[1]) and np.all(band[1] <= band[2]), f"{method} band is not ordered"
+        if method == "dropout":
+            # Without active Dropout layers every sample is the same rollout
+            assert width.max() > 0, "dropout band has zero width"
+        print(f"{samples} batched ({method:7s}): {seconds:7.2f} s, "
+              f"mean 90% width {width.mean():.1f} AQI, median vs point max |diff| "
+              f"{np.abs(band[1] - point).max():.1f} AQI")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:6])
@@ -0,0 +1,66 @@
+"""Size and build time of the forecast figure: one trace per segment vs per colour.
+
+Run from the repository root:  python -m benchmarks.forecast_figure
+"""
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+
+from utils.aqi import aqi_color
+from utils.plots import banded_line_traces
+
+
+bounds = [0, 50, 100, 150, 200, 300, 500]
+aqi_colors = ['#00E400', '#FFFF00', '#FF7E00', '#FF0000', '#8F3F97', '#7E0023']
+
+
+def get_aqi_color(value):
+    """The original per-value colour lookup, a linear scan over the bounds."""
+    for i in range(len(bounds) - 1):
+        if bounds[i] <= value < bounds[i + 1]:
+            return aqi_colors[i]
+    return aqi_colors[-1]
+
+
+def per_segment_figure(dates, predictions):
+    """The original create_figure: one go.Scatter per day pair."""
+    fig = go.Figure()
+    for i in range(len(predictions) - 1):
+        fig.add_trace(go.Scatter(
+            x=[dates[i], dates[i + 1]], y=[predictions[i], predictions[i + 1]], mode='lines',
+            line=dict(color=get_aqi_color((predictions[i] + predictions[i + 1]) / 2), width=3),
+            showlegend=False
+        ))
+    return fig
+
+
+def banded_figure(dates, predictions):
+    return go.Figure(banded_line_traces(dates, predictions, aqi_color))
+
+
+def measure(build, dates, predictions):
+    start = time.perf_counter()
+    fig = build(dates, predictions)
+    build_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    payload = fig.to_json()
+    return len(fig.data), len(payload.encode()), build_seconds, time.perf_counter() - start
+
+
+def main(days=1095):
+    # Seasonal series crossing several AQI bands, like the 3-year forecast
+    t = np.arange(days)
+    predictions = 60 + 45 * np.cos(2 * np.pi * t / 365) + np.random.default_rng(0).normal(0, 8, days)
+    dates = [pd.to_datetime('2025-04-01') + timedelta(days=i) for i in range(1, days + 1)]
+
+    for name, build in (("per segment", per_segment_figure), ("per colour", banded_figure)):
+        traces, size, build_seconds, json_seconds = measure(build, dates, predictions)
+        print(f"{name:12s}: {traces:5d} traces, {size / 1024:8.1f} KiB JSON, "
+              f"build {build_seconds * 1000:8.1f} ms, serialize {json_seconds * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Parity and per-step latency of CompiledModel against Keras model.predict.
+
+Runs offline on a small untrained LSTM with the production layer stack:
+
+    python -m benchmarks.forecast_inference
+
+or on the LSTM artifacts from the munkh_models_lstm bucket on local disk:
+
+    python -m benchmarks.forecast_inference rigorous_fresno_pm25_lstm_model.h5 \\
+        rigorous_fresno_pm25_last_60_scaled.npy rigorous_fresno_pm25_scaler.pkl
+"""
+import sys
+import time
+
+import joblib
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.layers import LSTM, Dense, Dropout, Input
+from tensorflow.keras.models import Sequential, load_model
+
+from benchmarks.forecast_rollout import make_scaler_and_window
+from utils.forecast import CompiledModel, predict_future
+
+
+def synthetic_model(units=32, seed=0):
+    """Untrained Input((60, 8)) -> LSTM -> Dropout -> Dense, like the county models."""
+    tf.keras.utils.set_random_seed(seed)
+    return Sequential([Input((60, 8)), LSTM(units), Dropout(0.2), Dense(1)])
+
+
+def load_artifacts(model_path=None, window_path=None, scaler_path=None):
+    """(model, seed window, scaler) from the given files, or synthetic ones without paths."""
+    if model_path is None:
+        scaler, window = make_scaler_and_window()
+        return synthetic_model(), window, scaler
+    return load_model(model_path, compile=False), np.load(window_path, allow_pickle=True), joblib.load(scaler_path)
+
+
+def per_step_ms(model, window, steps=100):
+    x = window.reshape(1, 60, -1)
+    model.predict(x, verbose=0)  # warm up (tracing, graph building)
+    start = time.perf_counter()
+    for _ in range(steps):
+        model.predict(x, verbose=0)
+    return (time.perf_counter() - start) / steps * 1000
+
+
+def main(model_path=None, window_path=None, scaler_path=None, days=30):
+    model, window, scaler = load_artifacts(model_path, window_path, scaler_path)
+    compiled = CompiledModel(model)
+
+    expected = predict_future(model, window, days, scaler)
+    result = predict_future(compiled, window, days, scaler)
+    max_diff = np.max(np.abs(result - expected))
+    np.testing.assert_allclose(result, expected, rtol=1e-4, atol=1e-3)
+
+    print(f"parity over {days} days: max |diff| {max_diff:.2e} AQI")
+    print(f"model.predict: {per_step_ms(model, window):.2f} ms/step")
+    print(f"CompiledModel: {per_step_ms(compiled, window):.2f} ms/step")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:4])
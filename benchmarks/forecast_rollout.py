@@ -0,0 +1,91 @@
+"""Benchmarks the LSTM rollout bookkeeping against the original implementation.
+
+A stub stands in for the Keras model so only the rollout overhead is timed.
+Run from the repository root:  python -m benchmarks.forecast_rollout
+"""
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+
+from utils.forecast import LAST_TIME_INDEX, LAST_TRAIN_DATE, predict_future
+
+
+class StubModel:
+    """Deterministic stand-in for the LSTM: a fixed linear readout of the window."""
+
+    def __init__(self, n_features=8, seed=0):
+        self.weights = np.random.default_rng(seed).normal(0, 0.01, (60, n_features)).astype(np.float32)
+
+    def predict(self, x, verbose=0):
+        return np.array([[np.float32(0.2) + np.sum(x[0].astype(np.float32) * self.weights, dtype=np.float32)]],
+                        dtype=np.float32)
+
+
+def make_scaler_and_window(seed=0):
+    rng = np.random.default_rng(seed)
+    history = np.column_stack([
+        rng.uniform(0, 200, 9587), np.arange(9587),
+        rng.uniform(-1, 1, (9587, 6))
+    ])
+    scaler = MinMaxScaler().fit(history)
+    return scaler, scaler.transform(history[-60:])
+
+
+def legacy_predict_future(model, last_60_scaled, days_to_predict, scaler):
+    """The original predict_future, which re-inverts the whole history every step."""
+    last_date = LAST_TRAIN_DATE
+    predictions = []
+    current_input = last_60_scaled.copy()
+    current_time_index = LAST_TIME_INDEX
+    for i in range(days_to_predict):
+        pred = model.predict(current_input.reshape(1, 60, -1), verbose=0)
+        predicted_aqi_scaled = pred[0, 0]
+        predictions.append(predicted_aqi_scaled)
+        current_time_index += 1
+        current_date = last_date + timedelta(days=i + 1)
+        day_of_year = current_date.timetuple().tm_yday
+        month = current_date.month
+        day_of_week = current_date.weekday()
+        time_features = np.array([[0, current_time_index,
+                                   np.sin(2 * np.pi * day_of_year / 365), np.cos(2 * np.pi * day_of_year / 365),
+                                   np.sin(2 * np.pi * month / 12), np.cos(2 * np.pi * month / 12),
+                                   np.sin(2 * np.pi * day_of_week / 7), np.cos(2 * np.pi * day_of_week / 7)]])
+        time_features_scaled = scaler.transform(time_features)
+        time_features_scaled[0, 0] = predicted_aqi_scaled
+        current_input = np.append(current_input[1:], [time_features_scaled[0]], axis=0)
+        aqi_predictions_scaled = np.array(predictions).reshape(-1, 1)
+        aqi_predictions = scaler.inverse_transform(
+            np.hstack([aqi_predictions_scaled, np.zeros((len(aqi_predictions_scaled), scaler.n_features_in_ - 1))])
+        )[:, 0]
+    return aqi_predictions
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main(horizons=(30, 120, 480, 1095)):
+    model = StubModel()
+    scaler, window = make_scaler_and_window()
+    rows = []
+    for days in horizons:
+        expected, legacy_seconds = timed(legacy_predict_future, model, window, days, scaler)
+        result, seconds = timed(predict_future, model, window, days, scaler)
+        # Vectorized sin/cos may differ from the scalar calls in the last ulp
+        np.testing.assert_allclose(result, expected, rtol=1e-12, atol=1e-9)
+        rows.append((days, legacy_seconds, seconds))
+
+    print(pd.DataFrame(rows, columns=["days", "original_s", "rollout_s"]).assign(
+        original_ms_per_day=lambda df: df.original_s / df.days * 1000,
+        rollout_ms_per_day=lambda df: df.rollout_s / df.days * 1000
+    ).to_string(index=False, float_format="%.4f"))
+    print("results match the original implementation")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Numerical check and timing of the stateful streaming forecaster vs window replay.
+
+Runs offline on a small untrained LSTM with the production layer stack:
+
+    python -m benchmarks.forecast_streaming
+
+or on the LSTM artifacts from the munkh_models_lstm bucket on local disk:
+
+    python -m benchmarks.forecast_streaming rigorous_fresno_pm25_lstm_model.h5 \\
+        rigorous_fresno_pm25_last_60_scaled.npy rigorous_fresno_pm25_scaler.pkl [days]
+"""
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.forecast_inference import load_artifacts
+from utils.forecast import (CompiledModel, StreamingForecaster, inverse_transform_column,
+                            predict_future, predict_future_streaming)
+
+
+def main(model_path=None, window_path=None, scaler_path=None, days=123):
+    days = int(days)
+    model, window, scaler = load_artifacts(model_path, window_path, scaler_path)
+    forecaster = StreamingForecaster(model)
+
+    # 1. Warm-up over the seed window reproduces the window model exactly (float32 tolerance)
+    expected_first = model.predict(window.reshape(1, 60, -1), verbose=0)[0, 0]
+    first, _ = forecaster.warm_up(window)
+    np.testing.assert_allclose(first[0], expected_first, rtol=1e-4, atol=1e-5)
+    print(f"first step: window {expected_first:.6f} vs streaming {first[0]:.6f}")
+
+    # 2. Full rollouts: window replay against streaming
+    compiled = CompiledModel(model)
+    start = time.perf_counter()
+    replay = predict_future(compiled, window, days, scaler)
+    replay_seconds = time.perf_counter() - start
+
+    forecaster = StreamingForecaster(model)
+    start = time.perf_counter()
+    streaming = predict_future_streaming(forecaster, window, days, scaler)
+    streaming_seconds = time.perf_counter() - start
+
+    # The rollouts share their first day, so a wrong gate order or activation fails here
+    np.testing.assert_allclose(streaming[0], replay[0], rtol=1e-4, atol=1e-2)
+
+    # 3. Later days see the whole history instead of the last 60 days and may drift
+    diff = np.abs(streaming - replay)
+    one_aqi_scaled = inverse_transform_column(scaler, [1.0]) - inverse_transform_column(scaler, [0.0])
+    print(f"{days} days: max |diff| {diff.max():.2f} AQI, mean {diff.mean():.2f} AQI "
+          f"(scaled unit = {one_aqi_scaled[0]:.1f} AQI)")
+    print(f"window replay: {replay_seconds / days * 1000:.2f} ms/day")
+    print(f"streaming:     {streaming_seconds / days * 1000:.3f} ms/day")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:5])
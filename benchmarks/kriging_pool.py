@@ -0,0 +1,45 @@
+"""Measures the Kriging grid speedup from the process pool by worker count.
+
+Run from the repository root:  python -m benchmarks.kriging_pool [resolution]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.kriging_grid import make_stations
+from utils.kriging import KrigingModel
+from utils.kriging_pool import KrigingPool
+
+
+def main(resolution=0.01, n_stations=60):
+    lons, lats, aqi = make_stations(n_stations)
+    grid_lats, grid_lons = np.meshgrid(np.arange(lats.min(), lats.max(), resolution),
+                                       np.arange(lons.min(), lons.max(), resolution),
+                                       indexing="ij")
+    grid_lats, grid_lons = grid_lats.ravel(), grid_lons.ravel()
+    model = KrigingModel.fit(lons, lats, aqi)
+
+    print(f"{grid_lats.size} grid points, {n_stations} monitors")
+    serial_seconds = None
+    expected = None
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        pool = KrigingPool(max_workers=workers)
+        pool.predict(model, grid_lons, grid_lats)  # warm up the worker processes
+
+        start = time.perf_counter()
+        predictions, _ = pool.predict(model, grid_lons, grid_lats)
+        seconds = time.perf_counter() - start
+        pool.shutdown()
+
+        if expected is None:
+            serial_seconds, expected = seconds, predictions
+        np.testing.assert_allclose(predictions, expected, rtol=1e-10)
+        print(f"{workers:2d} worker(s): {seconds:.3f}s  speedup x{serial_seconds / seconds:.2f}")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main(*(float(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,54 @@
+"""Compares payload size and build time of the scatter and raster Kriging maps.
+
+Run from the repository root:  python -m benchmarks.kriging_render
+"""
+import time
+
+import numpy as np
+import plotly.graph_objects as go
+
+from benchmarks.kriging_grid import make_stations
+from utils.kriging import KrigingModel, krige_surface
+from utils.raster import surface_image_layer
+
+
+def scatter_figure(surface):
+    """The original update_map grid: one coloured marker per cell."""
+    lats, lons, predictions, _ = surface.points()
+    fig = go.Figure(go.Scattermapbox(
+        lat=lats.tolist(), lon=lons.tolist(), mode="markers",
+        marker=dict(size=6, color=predictions, colorscale="Viridis", showscale=False, opacity=0.3)
+    ))
+    fig.update_layout(mapbox_style="open-street-map")
+    return fig
+
+
+def raster_figure(surface):
+    fig = go.Figure(go.Scattermapbox())
+    fig.update_layout(mapbox_style="open-street-map",
+                      mapbox_layers=[surface_image_layer(surface, colorscale="Viridis", opacity=0.3)])
+    return fig
+
+
+def measure(build, surface, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        payload = build(surface).to_json()
+    return len(payload.encode()), (time.perf_counter() - start) / repeat
+
+
+def main():
+    lons, lats, aqi = make_stations()
+    model = KrigingModel.fit(lons, lats, aqi)
+    for resolution in (0.05, 0.025, 0.01):
+        surface = krige_surface(model, lons, lats, resolution=resolution)
+        cells = int(np.isfinite(surface.predictions).sum())
+        scatter_bytes, scatter_seconds = measure(scatter_figure, surface)
+        raster_bytes, raster_seconds = measure(raster_figure, surface)
+        print(f"{resolution:>6} deg, {cells:6d} cells | "
+              f"scatter {scatter_bytes / 1024:8.1f} KiB {scatter_seconds * 1000:7.1f} ms | "
+              f"raster {raster_bytes / 1024:6.1f} KiB {raster_seconds * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Cold-start loading of every page's artifacts: one after another vs concurrently.
+
+Each run starts from an empty artifact cache. The Fresno model is then loaded
+from the cache, as the forecast page does, to check cached copies stay
+loadable. Needs GCS credentials, or
+ARTIFACT_LOCAL_DIR pointing at a local copy of the buckets:
+
+    python -m benchmarks.startup_loading
+"""
+import tempfile
+import time
+
+from utils.artifacts import artifacts
+from utils.startup import STARTUP_ARTIFACTS, StartupLoader
+
+
+def main():
+    artifacts.cache_dir = tempfile.mkdtemp()
+    sequential = {}
+    start = time.perf_counter()
+    for name, load in STARTUP_ARTIFACTS.items():
+        step = time.perf_counter()
+        load()
+        sequential[name] = time.perf_counter() - step
+    sequential_seconds = time.perf_counter() - start
+
+    artifacts.cache_dir = tempfile.mkdtemp()
+    loader = StartupLoader(STARTUP_ARTIFACTS)
+    start = time.perf_counter()
+    loader.start()
+    for name in STARTUP_ARTIFACTS:
+        loader.get(name)
+    concurrent_seconds = time.perf_counter() - start
+
+    for name in STARTUP_ARTIFACTS:
+        print(f"{name:32s} sequential {sequential[name]:6.2f} s   concurrent {loader.timings[name]:6.2f} s")
+    print(f"total: sequential {sequential_seconds:.2f} s, concurrent {concurrent_seconds:.2f} s "
+          f"(slowest artifact {max(sequential.values()):.2f} s)")
+
+    # Keras picks the loader from the extension, so the cached copy must keep it
+    path = loader.get("fresno_pm25_lstm_model.h5")
+    assert path.endswith(".h5"), path
+    step = time.perf_counter()
+    artifacts.load_keras_model("munkh_models_lstm", "rigorous_fresno_pm25_lstm_model.h5")
+    print(f"fresno model loaded from {path} in {time.perf_counter() - step:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
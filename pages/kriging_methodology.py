@@ -2,8 +2,6 @@ import dash
 from dash import Dash, html, dash_table
 from dash import html
 import pandas as pd
-from google.cloud import storage
-from io import StringIO
 
 dash.register_page(__name__, path="/kriging-methodology")
 
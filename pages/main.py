@@ -1,5 +1,6 @@
 import dash
 from dash import html
+from utils.aqi import AQI_BANDS
 
 dash.register_page(__name__, path="/")
 
@@ -49,12 +50,7 @@ layout = html.Div([
     html.H3("How to interpret an AQI level?", style={'marginTop': '30px', 'color': '#34495e'}),
     
     html.Ul([
-        html.Li("0 - 50: Good"),
-        html.Li("51 - 100: Moderate"),
-        html.Li("101 - 150: Unhealthy for Sensitive Groups"),
-        html.Li("151 - 200: Unhealthy"),
-        html.Li("201 - 300: Very Unhealthy"),
-        html.Li("301 - 500: Hazardous")
+        html.Li(f"{low} - {high}: {category}") for low, high, category, _ in AQI_BANDS
     ], style={'fontSize': '16px', 'marginLeft': '20px', 'lineHeight': '1.8'}),
     
     html.H3("How the data was collected?", style={'marginTop': '30px', 'color': '#34495e'}),
@@ -1,38 +1,87 @@
 import dash
 from dash import html, dcc, callback, Input, Output
 import pandas as pd
-from google.cloud import storage
-from io import StringIO
-from pykrige.ok import OrdinaryKriging
+import os
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-import geopandas as gpd
-from shapely.geometry import Point
-from shapely.ops import unary_union
-from geopy.distance import geodesic
+from utils.aqi import aqi_colorscale
+from utils.cache import LRUCache
+from utils.kriging import KrigingCache, adaptive_krige_surface, is_within_distance, krige_surface
+from utils.kriging_pool import KrigingPool
+from utils.kriging_store import SurfaceStore
+from utils.raster import surface_image_layer
+from utils.metrics import callback_metrics
+from utils.startup import startup
 
 
 dash.register_page(__name__, path="/predict-at-unsampled-locations")
 
 
-# Helper function to get CSV from GCS
-def get_csv_from_gcs(bucket_name, file_name):
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(bucket_name)
-    blob = bucket.blob(file_name)
-    if not blob.exists():
-        raise FileNotFoundError("File does not exist")
-    data = blob.download_as_text()
-    return pd.read_csv(StringIO(data))
+# Daily monitor table, loaded on first render or callback, with an index of
+# date -> row range so callbacks slice a day without scanning the table
+sjv_pm25_daily = startup.handle("sjv_pm25_daily")
 
 
-# Load data
-sjv_pm25 = get_csv_from_gcs("sjv_pm25", "sjv_pm25_daily_df.csv")
+# Fitted Kriging models shared by the map and click callbacks
+kriging_cache = KrigingCache(max_bytes=int(os.environ.get("KRIGING_CACHE_MB", "64")) * 1024 * 1024)
+callback_metrics.register_cache("kriging_models", kriging_cache.stats)
+
+
+def get_kriging_model(date, subset):
+    """Returns the (cached) Kriging model fitted to the monitors of the given date."""
+    return kriging_cache.get(date, subset['longitude'].values, subset['latitude'].values, subset['aqi'].values)
+
+
+# Process pool for large grids; KRIGING_WORKERS=1 (the default) runs serially.
+# More workers are meant for gunicorn (see KrigingPool)
+kriging_pool = KrigingPool(max_workers=int(os.environ.get("KRIGING_WORKERS", "1")))
+
+
+# Optional moving-window Kriging: limit each prediction to the nearest monitors
+# and/or those within a radius (km), instead of every monitor of the day
+KRIGING_MAX_NEIGHBORS = int(os.environ["KRIGING_MAX_NEIGHBORS"]) if os.environ.get("KRIGING_MAX_NEIGHBORS") else None
+KRIGING_RADIUS_KM = float(os.environ["KRIGING_RADIUS_KM"]) if os.environ.get("KRIGING_RADIUS_KM") else None
+LOCAL_KRIGING = KRIGING_MAX_NEIGHBORS is not None or KRIGING_RADIUS_KM is not None
+
+
+# Map resolution in degrees; adaptive mode kriges a coarse grid and refines
+# only where the surface changes quickly or is uncertain
+KRIGING_RESOLUTION = float(os.environ.get("KRIGING_RESOLUTION", "0.05"))
+KRIGING_ADAPTIVE = os.environ.get("KRIGING_ADAPTIVE", "0") == "1"
+
+
+# Surfaces precomputed offline with `python -m utils.kriging_store`, if deployed
+surface_store = SurfaceStore.open(os.environ.get("KRIGING_STORE_DIR", "kriging_store"))
+
+
+# Surfaces kriged live, so re-rendering a date (e.g. toggling the uncertainty layer) solves nothing
+surface_cache = LRUCache(max_bytes=int(os.environ.get("KRIGING_SURFACE_CACHE_MB", "32")) * 1024 * 1024)
+callback_metrics.register_cache("kriging_surfaces", surface_cache.stats)
+
+
+def get_surface(date, subset):
+    """Returns the prediction and variance surface for the date, from the store when available."""
+    # The store holds global Kriging surfaces only
+    if surface_store is not None and not LOCAL_KRIGING and date in surface_store:
+        surface = surface_store.get(date)
+        if np.isclose(surface.resolution, KRIGING_RESOLUTION):
+            return surface
+
+    def build():
+        model = get_kriging_model(date, subset)
+        build_surface = adaptive_krige_surface if KRIGING_ADAPTIVE else krige_surface
+        return build_surface(model, subset['longitude'].values, subset['latitude'].values,
+                             resolution=KRIGING_RESOLUTION,
+                             n_closest=KRIGING_MAX_NEIGHBORS, radius_km=KRIGING_RADIUS_KM, pool=kriging_pool)
+
+    return surface_cache.get(str(date), build)
 
 
 # Create individual buffer zones
 def create_buffer_zone(df, radius_km=200):
+    import geopandas as gpd  # deferred: geopandas is slow to import
+
     gdf = gpd.GeoDataFrame(df,
                            geometry=gpd.points_from_xy(df['longitude'], df['latitude']),
                            crs="EPSG:4326").to_crs(epsg=3395)
@@ -40,152 +89,153 @@ def create_buffer_zone(df, radius_km=200):
     return gdf.to_crs(epsg=4326)
 
 
-
-
-# Check if clicked point is within allowable prediction distance
-def is_within_distance(lon, lat, longitudes, latitudes, threshold_km=200):
-    for lon0, lat0 in zip(longitudes, latitudes):
-        if geodesic((lat, lon), (lat0, lon0)).km <= threshold_km:
-            return True
-    return False
-
-layout = html.Div([
-    html.Div([
-        html.H2("Predict PM 2.5 AQI at Unsampled Locations", style={
-            'textAlign': 'center',
-            'fontFamily': 'Arial',
-            'marginBottom': '10px'
-        }),
-        html.P(
-            "Our team implemented a Kriging Model to predict at unsampled locations on different days. "
-            "The model uses all monitor values within 200 km or 125 mi. Click the methodology button below to learn more.",
-            style={
+def layout(**kwargs):
+    return html.Div([
+        html.Div([
+            html.H2("Predict PM 2.5 AQI at Unsampled Locations", style={
                 'textAlign': 'center',
                 'fontFamily': 'Arial',
-                'maxWidth': '800px',
-                'margin': 'auto'
-            }
-        ),
-    ], style={'marginBottom': '30px'}),
-
-    html.Div([
-        html.Label("Select a Date:", style={
-            'fontWeight': 'bold',
-            'fontSize': '16px',
-            'marginRight': '10px'
-        }),
-        dcc.DatePickerSingle(
-            id='date-picker',
-            min_date_allowed=pd.to_datetime(sjv_pm25["date_local"]).min(),
-            max_date_allowed=pd.to_datetime(sjv_pm25["date_local"]).max(),
-            initial_visible_month=pd.to_datetime("2024-01-01"),
-            date="2024-01-01",
-            style={'display': 'inline-block'}
-        ),
-    ], style={'textAlign': 'center', 'marginBottom': '30px'}),
-
-    dcc.Loading(
-        id="loading-spinner",
-        type="circle",
-        fullscreen=False,
-        children=html.Div([
-            dcc.Graph(id='map', config={'displayModeBar': False}),
-            html.Div(id='prediction-output', style={
-                'textAlign': 'center',
-                'marginTop': '15px',
-                'fontFamily': 'Arial',
-                'fontSize': '16px'
-            })
-        ])
-    ),
-
-    html.Br(),
-
-    html.Div([
-        html.A(
-            html.Button("View Methodology", style={
-                "padding": "10px 20px",
-                "fontSize": "16px",
-                "backgroundColor": "#4CAF50",
-                "color": "white",
-                "border": "none",
-                "borderRadius": "5px",
-                "cursor": "pointer",
-                "marginTop": "10px"
+                'marginBottom': '10px'
             }),
-            href="/kriging-methodology"
-        )
-    ], style={'textAlign': 'center', 'marginTop': '20px'})
-], style={
-    'maxWidth': '1000px',
-    'margin': '0 auto',
-    'padding': '20px',
-    'fontFamily': 'Arial, sans-serif'
-})
-
-
-# Helper function to create a grid of points
-def create_grid(min_lat, max_lat, min_lon, max_lon, resolution=0.05):
-    latitudes = np.arange(min_lat, max_lat, resolution)
-    longitudes = np.arange(min_lon, max_lon, resolution)
-    grid = []
-    for lat in latitudes:
-        for lon in longitudes:
-            grid.append((lat, lon))
-    return grid
-
+            html.P(
+                "Our team implemented a Kriging Model to predict at unsampled locations on different days. "
+                "The model uses all monitor values within 200 km or 125 mi. Click the methodology button below to learn more.",
+                style={
+                    'textAlign': 'center',
+                    'fontFamily': 'Arial',
+                    'maxWidth': '800px',
+                    'margin': 'auto'
+                }
+            ),
+        ], style={'marginBottom': '30px'}),
+
+        html.Div([
+            html.Label("Select a Date:", style={
+                'fontWeight': 'bold',
+                'fontSize': '16px',
+                'marginRight': '10px'
+            }),
+            dcc.DatePickerSingle(
+                id='date-picker',
+                min_date_allowed=sjv_pm25_daily.get().min_date,
+                max_date_allowed=sjv_pm25_daily.get().max_date,
+                initial_visible_month=pd.to_datetime("2024-01-01"),
+                date="2024-01-01",
+                style={'display': 'inline-block'}
+            ),
+            dcc.Checklist(
+                id='uncertainty-toggle',
+                options=[{'label': ' Show prediction uncertainty (kriging standard deviation)', 'value': 'show'}],
+                value=[],
+                style={'marginTop': '10px'}
+            ),
+        ], style={'textAlign': 'center', 'marginBottom': '30px'}),
+
+        dcc.Loading(
+            id="loading-spinner",
+            type="circle",
+            fullscreen=False,
+            children=html.Div([
+                dcc.Graph(id='map', config={'displayModeBar': False}),
+                html.Div(id='prediction-output', style={
+                    'textAlign': 'center',
+                    'marginTop': '15px',
+                    'fontFamily': 'Arial',
+                    'fontSize': '16px'
+                })
+            ])
+        ),
 
-colorscale = "Viridis"
+        html.Br(),
+
+        html.Div([
+            html.A(
+                html.Button("View Methodology", style={
+                    "padding": "10px 20px",
+                    "fontSize": "16px",
+                    "backgroundColor": "#4CAF50",
+                    "color": "white",
+                    "border": "none",
+                    "borderRadius": "5px",
+                    "cursor": "pointer",
+                    "marginTop": "10px"
+                }),
+                href="/kriging-methodology"
+            )
+        ], style={'textAlign': 'center', 'marginTop': '20px'})
+    ], style={
+        'maxWidth': '1000px',
+        'margin': '0 auto',
+        'padding': '20px',
+        'fontFamily': 'Arial, sans-serif'
+    })
+
+
+# KRIGING_COLORSCALE=aqi colours the grid by EPA AQI category over a fixed 0-500 range;
+# any Plotly colorscale name (e.g. Viridis) spans the day's min to max instead
+KRIGING_COLORSCALE = os.environ.get("KRIGING_COLORSCALE", "aqi")
+if KRIGING_COLORSCALE == "aqi":
+    colorscale, color_range = aqi_colorscale(), (0, 500)
+else:
+    colorscale, color_range = KRIGING_COLORSCALE, (None, None)
+uncertainty_colorscale = "Reds"
+# Right of the station markers' AQI colorbar, which keeps Plotly's default position
+uncertainty_colorbar = dict(title="Std. Dev.", x=1.15)
+
+# "scatter" sends one marker per grid cell; "raster" sends the grid as a single PNG
+# overlay plus a sparse, invisible layer that keeps the map clickable
+KRIGING_MAP_RENDER = os.environ.get("KRIGING_MAP_RENDER", "scatter")
+CLICK_LAYER_STRIDE = 3
 
 
 # Update map with prediction area, buffer zones, and AQI grid
 @callback(
     Output('map', 'figure'),
-    Input('date-picker', 'date')
+    Input('date-picker', 'date'),
+    Input('uncertainty-toggle', 'value')
 )
-def update_map(date):
+@callback_metrics.instrument()
+def update_map(date, uncertainty_toggle=None):
     if date is None:
         return go.Figure()
 
 
-    subset = sjv_pm25[sjv_pm25["date_local"] == date]
+    subset = sjv_pm25_daily.get().day(date).dropna(subset=["latitude", "longitude", "aqi"])
     if subset.empty:
         return go.Figure()
 
 
-    # Create grid points for AQI prediction
-    min_lat, max_lat = subset["latitude"].min(), subset["latitude"].max()
-    min_lon, max_lon = subset["longitude"].min(), subset["longitude"].max()
-    grid_points = create_grid(min_lat, max_lat, min_lon, max_lon, resolution=0.05)
-
+    # Predict AQI on the grid around the monitors (precomputed or kriged once for the date)
+    try:
+        surface = get_surface(date, subset)
+    except Exception as e:
+        callback_metrics.record_exception("update_map", e)
+        surface = None
 
-    # Predict AQI for each grid point using Kriging
-    aqi_predictions = []
-    for lat, lon in grid_points:
-        if is_within_distance(lon, lat, subset['longitude'].values, subset['latitude'].values):
-            try:
-                OK = OrdinaryKriging(
-                    subset['longitude'].values,
-                    subset['latitude'].values,
-                    subset['aqi'].values,
-                    variogram_model="spherical",
-                    variogram_parameters={"sill": 60, "range": 3500.0, "nugget": 5}
-                )
-                pred, var = OK.execute("points", [lon], [lat])
-                aqi_predictions.append((lat, lon, pred[0]))
-            except Exception:
-                continue
+    if surface is not None:
+        grid_lats, grid_lons, predictions, variances = surface.points()
+    else:
+        grid_lats, grid_lons, predictions, variances = np.empty(0), np.empty(0), np.empty(0), np.empty(0)
 
 
-    # Convert grid predictions to DataFrame
-    grid_df = pd.DataFrame(aqi_predictions, columns=["latitude", "longitude", "predicted_aqi"])
+    # Convert grid predictions to DataFrame; the standard deviation comes from the same solve
+    grid_df = pd.DataFrame({
+        "latitude": grid_lats,
+        "longitude": grid_lons,
+        "predicted_aqi": predictions,
+        "std_dev": np.sqrt(np.clip(variances, 0, None))
+    })
+    show_uncertainty = bool(uncertainty_toggle) and len(grid_df) > 0
 
 
     # Plot the map
     fig = px.scatter_mapbox(
-        sjv_pm25[sjv_pm25["date_local"] == "2024-01-01"],
+        sjv_pm25_daily.get().day("2024-01-01"),
         lat="latitude", lon="longitude",
         color="aqi", hover_name="site_number",
+        # Same colours as the grid, so a station and the surface around it agree
+        color_continuous_scale=colorscale,
+        range_color=color_range if color_range[0] is not None else None,
         zoom=6, height=600
     )
 
@@ -200,6 +250,45 @@ def update_map(date):
 
 
 
+    if KRIGING_MAP_RENDER == "raster" and surface is not None and len(grid_df):
+        # Draw the grid as one image and keep a thinned, invisible layer for clicks
+        layers = [surface_image_layer(surface, colorscale=colorscale, cmin=color_range[0], cmax=color_range[1],
+                                      opacity=0.3)]
+        if show_uncertainty:
+            std_dev = np.sqrt(np.clip(surface.variances, 0, None))
+            std_min, std_max = float(np.nanmin(std_dev)), float(np.nanmax(std_dev))
+            layers.append(surface_image_layer(surface, values=std_dev, colorscale=uncertainty_colorscale,
+                                              cmin=std_min, cmax=std_max, opacity=0.5))
+            # The image layer has no legend of its own, so an empty trace carries its colorbar
+            fig.add_trace(go.Scattermapbox(
+                lat=[None], lon=[None],
+                mode="markers",
+                marker=dict(
+                    color=[std_min],
+                    colorscale=uncertainty_colorscale,
+                    cmin=std_min,
+                    cmax=std_max,
+                    showscale=True,
+                    colorbar=uncertainty_colorbar
+                ),
+                hoverinfo="none",
+                showlegend=False
+            ))
+        fig.update_layout(mapbox_layers=layers)
+        rows = np.rint((grid_df["latitude"] - surface.bounds[0]) / surface.resolution).astype(int)
+        cols = np.rint((grid_df["longitude"] - surface.bounds[2]) / surface.resolution).astype(int)
+        click_df = grid_df[(rows % CLICK_LAYER_STRIDE == 0) & (cols % CLICK_LAYER_STRIDE == 0)]
+        fig.add_trace(go.Scattermapbox(
+            lat=click_df["latitude"].round(4).tolist(),
+            lon=click_df["longitude"].round(4).tolist(),
+            mode="markers",
+            marker=dict(size=6 * CLICK_LAYER_STRIDE, opacity=0),
+            hoverinfo="none",
+            name="Predicted AQI Grid"
+        ))
+        return fig
+
+
     # Add grid cells with AQI predictions
     # Add grid cells with AQI predictions (hidden)
     fig.add_trace(go.Scattermapbox(
@@ -209,7 +298,9 @@ def update_map(date):
         marker=dict(
             size=6,  # Adjust the size if needed
             color=grid_df["predicted_aqi"],
-            colorscale="Viridis",
+            colorscale=colorscale,
+            cmin=color_range[0],
+            cmax=color_range[1],
             showscale=False,
             opacity=0.3  # Adjust the opacity for a lighter appearance
         ),
@@ -217,6 +308,24 @@ def update_map(date):
     ))
 
 
+    # Optional uncertainty layer
+    if show_uncertainty:
+        fig.add_trace(go.Scattermapbox(
+            lat=grid_df["latitude"].tolist(),
+            lon=grid_df["longitude"].tolist(),
+            mode="markers",
+            marker=dict(
+                size=6,
+                color=grid_df["std_dev"],
+                colorscale=uncertainty_colorscale,
+                showscale=True,
+                colorbar=uncertainty_colorbar,
+                opacity=0.5
+            ),
+            name="Prediction Uncertainty"
+        ))
+
+
     return fig
    
 # Predict AQI when map is clicked
@@ -225,6 +334,7 @@ def update_map(date):
     Input('map', 'clickData'),
     Input('date-picker', 'date')
 )
+@callback_metrics.instrument()
 def predict_aqi(clickData, date):
     if clickData is None or date is None:
         return "Click on the map to get AQI prediction."
@@ -234,7 +344,7 @@ def predict_aqi(clickData, date):
     lon = clickData['points'][0]['lon']
 
 
-    subset = sjv_pm25[sjv_pm25["date_local"] == date].dropna(subset=["latitude", "longitude", "aqi"])
+    subset = sjv_pm25_daily.get().day(date).dropna(subset=["latitude", "longitude", "aqi"])
     if subset.empty:
         return "No data available for this date."
 
@@ -244,15 +354,11 @@ def predict_aqi(clickData, date):
 
 
     try:
-        # Updated range parameter to 3500.0
-        OK = OrdinaryKriging(
-            subset['longitude'].values,
-            subset['latitude'].values,
-            subset['aqi'].values,
-            variogram_model="spherical",
-            variogram_parameters={"sill": 60, "range": 3500.0, "nugget": 5}
-        )
-        pred, var = OK.execute("points", [lon], [lat])
+        model = get_kriging_model(date, subset)
+        pred, var = model.predict([lon], [lat], n_closest=KRIGING_MAX_NEIGHBORS, radius_km=KRIGING_RADIUS_KM)
+        if np.isnan(pred[0]) and KRIGING_RADIUS_KM is not None:
+            # Moving-window Kriging found no monitor inside KRIGING_RADIUS_KM
+            return f"No monitors within {KRIGING_RADIUS_KM:g} km of this point."
         if np.isnan(var[0]) or var[0] < 0:
             uncertainty = "N/A"
             style = "gray"
@@ -269,6 +375,7 @@ def predict_aqi(clickData, date):
             )
         ])
     except Exception as e:
+        callback_metrics.record_exception("predict_aqi", e)
         return f"Prediction failed: {str(e)}"
 
 
@@ -0,0 +1,71 @@
+import numpy as np
+
+
+# EPA AQI categories: (lowest AQI, highest AQI, name, colour)
+AQI_BANDS = [
+    (0, 50, "Good", "#00E400"),
+    (51, 100, "Moderate", "#FFFF00"),
+    (101, 150, "Unhealthy for Sensitive Groups", "#FF7E00"),
+    (151, 200, "Unhealthy", "#FF0000"),
+    (201, 300, "Very Unhealthy", "#8F3F97"),
+    (301, 500, "Hazardous", "#7E0023"),
+]
+AQI_BOUNDS = np.array([0, 50, 100, 150, 200, 300, 500])
+AQI_CATEGORIES = np.array([band[2] for band in AQI_BANDS])
+AQI_COLORS = np.array([band[3] for band in AQI_BANDS])
+
+# EPA 24-hour PM 2.5 breakpoints (2024 revision): concentration (µg/m³) range -> AQI range
+PM25_BREAKPOINTS = np.array([
+    (0.0, 9.0, 0, 50),
+    (9.1, 35.4, 51, 100),
+    (35.5, 55.4, 101, 150),
+    (55.5, 125.4, 151, 200),
+    (125.5, 225.4, 201, 300),
+    (225.5, 325.4, 301, 500),
+])
+
+
+def aqi_band(aqi):
+    """Index into AQI_BANDS of each AQI value; values up to and including 50 are Good, and so on.
+
+    Works on scalars and arrays in one vectorized lookup. Values above 500 fall in
+    the last band and negative values in the first.
+    """
+    return np.searchsorted(AQI_BOUNDS[1:-1], aqi, side="left")
+
+
+def aqi_color(aqi):
+    """Hex colour of each AQI value (a str for a scalar, an array otherwise)."""
+    colors = AQI_COLORS[aqi_band(aqi)]
+    return str(colors) if np.ndim(colors) == 0 else colors
+
+
+def aqi_category(aqi):
+    """Category name of each AQI value (a str for a scalar, an array otherwise)."""
+    categories = AQI_CATEGORIES[aqi_band(aqi)]
+    return str(categories) if np.ndim(categories) == 0 else categories
+
+
+def pm25_to_aqi(concentration):
+    """Converts 24-hour PM 2.5 concentrations (µg/m³) to AQI with the EPA piecewise formula.
+
+    Concentrations are truncated to 0.1 µg/m³ and the AQI rounded to an integer,
+    as EPA does; values above the last breakpoint extend its line. NaNs stay NaN.
+    """
+    concentration = np.floor(np.clip(np.asarray(concentration, dtype=float), 0, None) * 10 + 1e-9) / 10
+    c_low, c_high, i_low, i_high = PM25_BREAKPOINTS.T
+    # Truncated values between breakpoints (e.g. 9.05 -> 9.0) fall in the lower band
+    band = np.minimum(np.searchsorted(c_high, concentration, side="left"), len(PM25_BREAKPOINTS) - 1)
+    aqi = (i_high[band] - i_low[band]) / (c_high[band] - c_low[band]) * (concentration - c_low[band]) + i_low[band]
+    return np.where(np.isnan(concentration), np.nan, np.round(aqi))
+
+
+def aqi_colorscale(cmax=500):
+    """Stepped Plotly colorscale with the AQI band colours over an AQI range of 0 to cmax."""
+    colorscale = []
+    for (_, _, _, color), low, high in zip(AQI_BANDS, AQI_BOUNDS[:-1], AQI_BOUNDS[1:]):
+        if low >= cmax:
+            break
+        colorscale += [[low / cmax, color], [min(high / cmax, 1.0), color]]
+    colorscale[-1][0] = 1.0
+    return colorscale
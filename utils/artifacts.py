@@ -0,0 +1,206 @@
+import glob
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.profiling import profiler
+
+
+class GCSBackend:
+    """Google Cloud Storage through one reused client per thread, created on first use.
+
+    The HTTP session under storage.Client is not guaranteed to be thread-safe,
+    so concurrent loaders each get their own.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @property
+    def client(self):
+        if getattr(self._local, "client", None) is None:
+            from google.cloud import storage
+            self._local.client = storage.Client()
+        return self._local.client
+
+    def version(self, bucket_name, name):
+        """Generation of the blob (one metadata request), or None if it does not exist."""
+        blob = self.client.bucket(bucket_name).get_blob(name)
+        return None if blob is None else str(blob.generation or blob.etag)
+
+    def list(self, bucket_name, prefix=""):
+        """{name: version} of the blobs under prefix, from a single listing."""
+        return {blob.name: str(blob.generation or blob.etag)
+                for blob in self.client.list_blobs(bucket_name, prefix=prefix or None)}
+
+    def download(self, bucket_name, name, version, path):
+        # Pinning the generation guarantees the bytes match the cache key
+        blob = self.client.bucket(bucket_name).blob(name, generation=int(version) if version.isdigit() else None)
+        blob.download_to_filename(path)
+
+
+class LocalBackend:
+    """Artifacts laid out as <root>/<bucket>/<name>, for running offline."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, bucket_name, name):
+        return os.path.join(self.root, bucket_name, name)
+
+    def version(self, bucket_name, name):
+        path = self._path(bucket_name, name)
+        if not os.path.isfile(path):
+            return None
+        stat = os.stat(path)
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+    def list(self, bucket_name, prefix=""):
+        directory = os.path.join(self.root, bucket_name)
+        names = (os.path.relpath(path, directory)
+                 for path in glob.glob(os.path.join(directory, "**", "*"), recursive=True) if os.path.isfile(path))
+        return {name: self.version(bucket_name, name) for name in sorted(names) if name.startswith(prefix)}
+
+    def download(self, bucket_name, name, version, path):
+        with open(self._path(bucket_name, name), "rb") as src, open(path, "wb") as dst:
+            dst.write(src.read())
+
+
+class ArtifactStore:
+    """Loads bucket artifacts through a local disk cache keyed by blob generation.
+
+    A cached copy is reused as long as the blob's generation (or etag) is
+    unchanged, so a cold start costs one metadata request per artifact and
+    downloads only what changed. Versions seen in a bucket listing are trusted
+    without a further request. If the backend cannot be reached, the newest
+    cached copy is used.
+    """
+
+    def __init__(self, backend, cache_dir):
+        self.backend = backend
+        self.cache_dir = cache_dir
+        self._versions = {}  # (bucket, name) -> version from a listing, used once
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """ARTIFACT_LOCAL_DIR serves artifacts from a directory instead of GCS;
+        ARTIFACT_CACHE_DIR (default: the temp dir) holds downloaded copies.
+
+        On App Engine standard the temp dir is in memory and counts against the
+        instance's limit, so cached copies cost RAM on top of their parsed form.
+        Model files, the largest, are dropped from the cache once loaded.
+        """
+        local_dir = os.environ.get("ARTIFACT_LOCAL_DIR")
+        backend = LocalBackend(local_dir) if local_dir else GCSBackend()
+        cache_dir = os.environ.get("ARTIFACT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "aqi-artifacts"))
+        return cls(backend, cache_dir)
+
+    def _cache_path(self, bucket_name, name, version):
+        # <stem>@<version><ext>: loaders such as Keras pick the format from the extension
+        stem, ext = os.path.splitext(name)
+        return os.path.join(self.cache_dir, bucket_name, f"{stem}@{version}{ext}")
+
+    def _cached_versions(self, bucket_name, name):
+        """Cached copies of an artifact, newest first."""
+        stem, ext = os.path.splitext(os.path.join(self.cache_dir, bucket_name, name))
+        pattern = glob.escape(stem) + "@*" + glob.escape(ext)
+        return sorted(glob.glob(pattern), key=os.path.getmtime, reverse=True)
+
+    def list(self, bucket_name, prefix=""):
+        """Names of the artifacts in a bucket under prefix."""
+        versions = self.backend.list(bucket_name, prefix)
+        with self._lock:
+            self._versions.update({(bucket_name, name): version for name, version in versions.items()})
+        return list(versions)
+
+    def path(self, bucket_name, name):
+        """Local path of an up-to-date copy of the artifact; FileNotFoundError if missing."""
+        with self._lock:
+            version = self._versions.pop((bucket_name, name), None)
+        if version is None:
+            try:
+                version = self.backend.version(bucket_name, name)
+            except Exception as e:
+                cached = self._cached_versions(bucket_name, name)
+                if not cached:
+                    raise
+                print(f"Could not revalidate {bucket_name}/{name}, using cached copy: {e}")
+                return cached[0]
+        if version is None:
+            raise FileNotFoundError(f"{name} not found in bucket {bucket_name}")
+
+        path = self._cache_path(bucket_name, name, version)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            os.close(fd)
+            try:
+                with profiler.span("download", f"{bucket_name}/{name}"):
+                    self.backend.download(bucket_name, name, version, tmp_path)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            # Drop copies of older generations
+            for stale in self._cached_versions(bucket_name, name):
+                if stale != path:
+                    try:
+                        os.remove(stale)
+                    except FileNotFoundError:
+                        pass
+        return path
+
+    def read_bytes(self, bucket_name, name):
+        with open(self.path(bucket_name, name), "rb") as f:
+            return f.read()
+
+    def read_csv(self, bucket_name, name, **kwargs):
+        path = self.path(bucket_name, name)
+        with profiler.span("parse", name):
+            return pd.read_csv(path, **kwargs)
+
+    def read_all_csvs(self, bucket_name, max_workers=8):
+        """Every CSV in the bucket as {name: DataFrame}, fetched and parsed concurrently."""
+        names = [name for name in self.list(bucket_name) if name.endswith(".csv")]
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return dict(zip(names, pool.map(lambda name: self.read_csv(bucket_name, name), names)))
+
+    def load_numpy(self, bucket_name, name):
+        path = self.path(bucket_name, name)
+        with profiler.span("parse", name):
+            return np.load(path, allow_pickle=True)
+
+    def load_joblib(self, bucket_name, name):
+        import joblib
+
+        path = self.path(bucket_name, name)
+        with profiler.span("parse", name):
+            return joblib.load(path)
+
+    def load_keras_model(self, bucket_name, name, keep_cached=False):
+        """Loads a Keras model; the cached file is removed afterwards unless keep_cached."""
+        from tensorflow.keras.models import load_model
+
+        path = self.path(bucket_name, name)
+        with profiler.span("parse", name):
+            model = load_model(path, compile=False)
+        if not keep_cached:
+            self.discard(bucket_name, name)
+        return model
+
+    def discard(self, bucket_name, name):
+        """Removes every cached copy of an artifact; the next path() downloads it again."""
+        for path in self._cached_versions(bucket_name, name):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+# Shared by every page
+artifacts = ArtifactStore.from_env()
@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by the total size of its values.
+
+    Values are sized with sizeof (default: their nbytes attribute). Least recently
+    used entries are evicted once the total exceeds max_bytes, or the count
+    exceeds max_entries if given; the newest entry is always kept, even if it
+    alone is over budget. max_bytes=None leaves the size unbounded.
+    """
+
+    def __init__(self, max_bytes, sizeof=lambda value: value.nbytes, max_entries=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._last_used = {}  # key -> time.monotonic() of the last get
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, create):
+        """Returns the cached value for key, calling create() to build it on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._last_used[key] = time.monotonic()
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Build outside the lock so other keys are not blocked behind this one
+        value = create()
+        size = self.sizeof(value)
+
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key][0]
+            self._entries[key] = (value, size)
+            self._last_used[key] = time.monotonic()
+            self._bytes += size
+            while len(self._entries) > 1 and self._over_budget():
+                evicted_key, (_, evicted_size) = self._entries.popitem(last=False)
+                del self._last_used[evicted_key]
+                self._bytes -= evicted_size
+        return value
+
+    def _over_budget(self):
+        return ((self.max_bytes is not None and self._bytes > self.max_bytes)
+                or (self.max_entries is not None and len(self._entries) > self.max_entries))
+
+    def evict_idle(self, max_idle_seconds):
+        """Drops entries not used for max_idle_seconds; returns the evicted keys."""
+        cutoff = time.monotonic() - max_idle_seconds
+        with self._lock:
+            idle = [key for key, used in self._last_used.items() if used < cutoff]
+            for key in idle:
+                _, size = self._entries.pop(key)
+                del self._last_used[key]
+                self._bytes -= size
+        return idle
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._last_used.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries
+            }
@@ -0,0 +1,96 @@
+"""Date-indexed access to the daily monitor data.
+
+Convert the daily CSV once into a Parquet file (then upload it next to the CSV):
+
+    python -m utils.datasets sjv_pm25_daily_df.csv sjv_pm25_daily_df.parquet
+
+The file is sorted by date with one row group per year, so readers can also
+push date filters down to the row groups.
+"""
+import argparse
+import io
+
+import numpy as np
+import pandas as pd
+
+
+DATE_COLUMN = "date_local"
+
+
+def optimize_dtypes(df, date_column=DATE_COLUMN):
+    """Sorts by date and shrinks the columns: downcast integers, categorical strings."""
+    df = df.sort_values(date_column, kind="stable").reset_index(drop=True)
+    df[date_column] = df[date_column].astype(str)
+    for column in df.columns:
+        if column == date_column:
+            continue
+        if pd.api.types.is_integer_dtype(df[column]):
+            df[column] = pd.to_numeric(df[column], downcast="integer")
+        elif pd.api.types.is_object_dtype(df[column]):
+            df[column] = df[column].astype("category")
+    return df
+
+
+def write_parquet(df, path, date_column=DATE_COLUMN):
+    """Writes df as a date-sorted Parquet file with one row group per year."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    df = optimize_dtypes(df, date_column)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    years = df[date_column].str[:4].to_numpy()
+    with pq.ParquetWriter(path, table.schema, compression="zstd") as writer:
+        for year in np.unique(years):
+            rows = np.flatnonzero(years == year)
+            writer.write_table(table.slice(rows[0], len(rows)))
+
+
+def read_parquet(data):
+    """Reads a Parquet file from a path or raw bytes."""
+    if isinstance(data, (bytes, bytearray)):
+        data = io.BytesIO(data)
+    return pd.read_parquet(data)
+
+
+class DailyTable:
+    """Daily monitor rows sorted by date, with an O(1) date -> row range index."""
+
+    def __init__(self, df, date_column=DATE_COLUMN):
+        dates = df[date_column].astype(str)
+        if not dates.is_monotonic_increasing:
+            df = df.sort_values(date_column, kind="stable").reset_index(drop=True)
+            dates = df[date_column].astype(str)
+        dates = dates.to_numpy()
+        unique_dates, starts = np.unique(dates, return_index=True)
+        stops = np.append(starts[1:], len(df))
+
+        self.df = df
+        self.date_column = date_column
+        self.index = {date: (start, stop) for date, start, stop in zip(unique_dates, starts, stops)}
+        self.min_date = unique_dates[0] if len(unique_dates) else None
+        self.max_date = unique_dates[-1] if len(unique_dates) else None
+
+    def __len__(self):
+        return len(self.df)
+
+    def __contains__(self, date):
+        return str(date) in self.index
+
+    @property
+    def dates(self):
+        return list(self.index)
+
+    def day(self, date):
+        """Returns the rows of the given date (YYYY-MM-DD) as a DataFrame slice."""
+        start, stop = self.index.get(str(date), (0, 0))
+        return self.df.iloc[start:stop]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a daily monitor CSV to date-sorted Parquet.")
+    parser.add_argument("csv")
+    parser.add_argument("parquet")
+    args = parser.parse_args()
+
+    write_parquet(pd.read_csv(args.csv), args.parquet)
+    print(f"Wrote {args.parquet}")
@@ -0,0 +1,83 @@
+import numpy as np
+from geopy.distance import geodesic
+
+
+# Mean Earth radius (IUGG), in km
+EARTH_RADIUS_KM = 6371.0088
+
+# The spherical (haversine) distance is within ~0.57% of the WGS-84 geodesic,
+# so only points this close to the threshold need an exact geodesic check
+HAVERSINE_RELATIVE_ERROR = 0.007
+
+# Above this many stations a BallTree beats the dense distance matrix
+BALLTREE_MIN_STATIONS = 500
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between broadcastable arrays of coordinates."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=float)) for a in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def project_km(longitudes, latitudes, origin_lat):
+    """Equirectangular projection to (x, y) km around origin_lat, for KD-tree lookups."""
+    x = EARTH_RADIUS_KM * np.radians(np.asarray(longitudes, dtype=float)) * np.cos(np.radians(origin_lat))
+    y = EARTH_RADIUS_KM * np.radians(np.asarray(latitudes, dtype=float))
+    return np.column_stack((np.ravel(x), np.ravel(y)))
+
+
+def distance_matrix_km(lats, lons, station_lats, station_lons):
+    """Returns the (points x stations) haversine distance matrix in km."""
+    lats = np.asarray(lats, dtype=float).ravel()
+    lons = np.asarray(lons, dtype=float).ravel()
+    return haversine_km(lats[:, None], lons[:, None],
+                        np.asarray(station_lats, dtype=float)[None, :],
+                        np.asarray(station_lons, dtype=float)[None, :])
+
+
+def nearest_station_km(lats, lons, station_lats, station_lons, method="auto"):
+    """Returns the haversine distance in km from each point to its closest station.
+
+    method is "matrix" (dense NumPy), "balltree" (scikit-learn BallTree) or "auto".
+    """
+    lats = np.asarray(lats, dtype=float).ravel()
+    lons = np.asarray(lons, dtype=float).ravel()
+    station_lats = np.asarray(station_lats, dtype=float).ravel()
+    station_lons = np.asarray(station_lons, dtype=float).ravel()
+    if lats.size == 0 or station_lats.size == 0:
+        return np.full(lats.size, np.inf)
+
+    if method == "auto":
+        method = "balltree" if station_lats.size >= BALLTREE_MIN_STATIONS else "matrix"
+
+    if method == "matrix":
+        return distance_matrix_km(lats, lons, station_lats, station_lons).min(axis=1)
+    if method == "balltree":
+        from sklearn.neighbors import BallTree
+        tree = BallTree(np.radians(np.column_stack((station_lats, station_lons))), metric="haversine")
+        distances, _ = tree.query(np.radians(np.column_stack((lats, lons))), k=1)
+        return distances[:, 0] * EARTH_RADIUS_KM
+    raise ValueError(f"Unknown distance method: {method}")
+
+
+def within_distance_mask(lats, lons, station_lats, station_lons, threshold_km=200, method="auto"):
+    """Returns a boolean mask of the points within threshold_km (geodesic) of any station.
+
+    Distances are computed with haversine; only points whose distance falls within
+    the haversine error band around the threshold are rechecked with geopy's geodesic,
+    so the result matches a full geodesic check.
+    """
+    lats = np.asarray(lats, dtype=float).ravel()
+    lons = np.asarray(lons, dtype=float).ravel()
+    nearest = nearest_station_km(lats, lons, station_lats, station_lons, method)
+
+    mask = nearest <= threshold_km * (1 - HAVERSINE_RELATIVE_ERROR)
+    borderline = np.flatnonzero(~mask & (nearest <= threshold_km * (1 + HAVERSINE_RELATIVE_ERROR)))
+    for i in borderline:
+        mask[i] = any(
+            geodesic((lats[i], lons[i]), (lat0, lon0)).km <= threshold_km
+            for lat0, lon0 in zip(station_lats, station_lons)
+        )
+    return mask
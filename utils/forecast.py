@@ -0,0 +1,347 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+
+# Last training day and time index of the Fresno PM 2.5 LSTM
+LAST_TRAIN_DATE = pd.to_datetime('2025-03-31')
+LAST_TIME_INDEX = 9586
+
+
+class CompiledModel:
+    """Fast inference wrapper around a Keras model for the autoregressive rollout.
+
+    model.predict builds a data pipeline and runs callbacks on every call, which
+    dominates a one-row-per-day rollout. This traces a tf.function over the direct
+    model call once and reuses the graph. predict() mirrors model.predict, so it can
+    be passed anywhere the model is.
+    """
+
+    def __init__(self, model):
+        import tensorflow as tf
+
+        self.model = model
+        self._tf = tf
+        self._signature = [tf.TensorSpec((None,) + tuple(model.input_shape)[1:], tf.float32)]
+        self._calls = {}
+
+    @property
+    def input_shape(self):
+        return self.model.input_shape
+
+    def _get_call(self, training):
+        # One graph per training flag; Keras layers need it as a Python bool
+        if training not in self._calls:
+            self._calls[training] = self._tf.function(
+                lambda x: self.model(x, training=training),
+                input_signature=self._signature,
+                reduce_retracing=True
+            )
+        return self._calls[training]
+
+    def predict(self, x, verbose=0, training=False):
+        x = self._tf.convert_to_tensor(np.asarray(x, dtype=np.float32))
+        return self._get_call(bool(training))(x).numpy()
+
+
+def inverse_transform_column(scaler, values, column=0):
+    """Inverts the scaling of one feature column in closed form.
+
+    Gives exactly what scaler.inverse_transform returns for that column when the
+    other columns are zero, without building the full feature matrix.
+    """
+    values = np.array(values, dtype=np.float64)
+    if hasattr(scaler, "min_"):  # MinMaxScaler
+        values -= scaler.min_[column]
+        values /= scaler.scale_[column]
+    else:  # StandardScaler
+        if getattr(scaler, "scale_", None) is not None:
+            values *= scaler.scale_[column]
+        if getattr(scaler, "mean_", None) is not None:
+            values += scaler.mean_[column]
+    return values
+
+
+def calendar_features(last_date, days, last_time_index):
+    """Unscaled feature rows for the days after last_date, built in one vectorized pass.
+
+    Columns follow the training data: AQI (0 placeholder), time index, then the
+    sin/cos of day of year, month and day of week.
+    """
+    dates = pd.date_range(last_date + timedelta(days=1), periods=days, freq="D")
+    day_of_year = dates.dayofyear.to_numpy()
+    month = dates.month.to_numpy()
+    day_of_week = dates.weekday.to_numpy()
+
+    features = np.empty((days, 8), dtype=np.float64)
+    features[:, 0] = 0
+    features[:, 1] = last_time_index + np.arange(1, days + 1)
+    features[:, 2] = np.sin(2 * np.pi * day_of_year / 365)
+    features[:, 3] = np.cos(2 * np.pi * day_of_year / 365)
+    features[:, 4] = np.sin(2 * np.pi * month / 12)
+    features[:, 5] = np.cos(2 * np.pi * month / 12)
+    features[:, 6] = np.sin(2 * np.pi * day_of_week / 7)
+    features[:, 7] = np.cos(2 * np.pi * day_of_week / 7)
+    return features
+
+
+def scaled_calendar_features(scaler, last_date, days, last_time_index):
+    """calendar_features scaled with the training scaler in a single transform call."""
+    return scaler.transform(calendar_features(last_date, days, last_time_index))
+
+
+def predict_future(model, last_60_scaled, days_to_predict, scaler,
+                   last_date=LAST_TRAIN_DATE, last_time_index=LAST_TIME_INDEX):
+    """Autoregressively forecasts daily AQI for days_to_predict days after last_date."""
+    # Scaled predictions go into a preallocated buffer and are inverted once at the end
+    predictions_scaled = np.empty(days_to_predict, dtype=np.float64)
+
+    # Temporal features of every forecast day, scaled up front
+    future_features = scaled_calendar_features(scaler, last_date, days_to_predict, last_time_index)
+
+    current_input = last_60_scaled.copy()
+
+    for i in range(days_to_predict):
+        # Predict next AQI
+        pred = model.predict(current_input.reshape(1, 60, -1), verbose=0)
+
+        predicted_aqi_scaled = pred[0, 0]
+        predictions_scaled[i] = predicted_aqi_scaled
+
+        # Splice the predicted AQI into the day's precomputed features
+        next_features = future_features[i]
+        next_features[0] = predicted_aqi_scaled
+
+        # Add to the sequence
+        current_input = np.append(current_input[1:], [next_features], axis=0)
+
+    # Inverse transform only the AQI column
+    return inverse_transform_column(scaler, predictions_scaled)
+
+
+def predict_future_ensemble(model, last_60_scaled, days_to_predict, scaler, n_samples=100, method="dropout",
+                            noise_scale=0.02, quantiles=(0.05, 0.5, 0.95), seed=0,
+                            last_date=LAST_TRAIN_DATE, last_time_index=LAST_TIME_INDEX):
+    """Quantiles of n_samples perturbed rollouts, shaped (len(quantiles), days_to_predict).
+
+    All samples advance together as one (n_samples, 60, features) batch, so each
+    day costs one model call for the whole ensemble. method="dropout" keeps dropout
+    active at inference (MC-dropout, needs predict(..., training=True) such as
+    CompiledModel); method="noise" adds Gaussian noise of noise_scale (in scaled
+    units) to the seed window's AQI column and to every fed-back prediction.
+    """
+    if method not in ("dropout", "noise"):
+        raise ValueError(f"Unknown ensemble method: {method}")
+    rng = np.random.default_rng(seed)
+
+    predictions_scaled = np.empty((n_samples, days_to_predict), dtype=np.float64)
+    future_features = scaled_calendar_features(scaler, last_date, days_to_predict, last_time_index)
+
+    current_input = np.repeat(np.asarray(last_60_scaled, dtype=np.float64)[np.newaxis], n_samples, axis=0)
+    if method == "noise":
+        current_input[:, :, 0] += rng.normal(0, noise_scale, current_input.shape[:2])
+
+    for i in range(days_to_predict):
+        if method == "dropout":
+            pred = model.predict(current_input, verbose=0, training=True)
+        else:
+            pred = model.predict(current_input, verbose=0)
+
+        predicted_aqi_scaled = pred[:, 0]
+        predictions_scaled[:, i] = predicted_aqi_scaled
+
+        # Every sample shares the day's calendar features and feeds back its own AQI
+        next_features = np.repeat(future_features[i][np.newaxis], n_samples, axis=0)
+        next_features[:, 0] = predicted_aqi_scaled
+        if method == "noise":
+            next_features[:, 0] += rng.normal(0, noise_scale, n_samples)
+
+        current_input = np.concatenate([current_input[:, 1:], next_features[:, np.newaxis]], axis=1)
+
+    # The inverse scaling is monotonic, so quantiles can be taken after it
+    aqi_predictions = inverse_transform_column(scaler, predictions_scaled)
+    return np.quantile(aqi_predictions, quantiles, axis=0)
+
+
+def _sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+
+def _hard_sigmoid(x):
+    return np.clip(x / 6 + 0.5, 0, 1)
+
+
+_ACTIVATIONS = {
+    "sigmoid": _sigmoid,
+    "hard_sigmoid": _hard_sigmoid,
+    "tanh": np.tanh,
+    "relu": lambda x: np.maximum(x, 0),
+    "linear": lambda x: x,
+    None: lambda x: x,
+}
+
+
+def _activation(name):
+    if isinstance(name, dict):  # serialized Keras activation
+        name = name.get("config", {}).get("name", name.get("class_name"))
+    if name not in _ACTIVATIONS:
+        raise ValueError(f"Unsupported activation for streaming: {name}")
+    return _ACTIVATIONS[name]
+
+
+class StreamingForecaster:
+    """Runs the trained LSTM one timestep per day, carrying hidden and cell state.
+
+    The window model re-reads a full 60-day window for every forecast day. This
+    forecaster takes the same weights, warms up on the seed window once, and then
+    advances a single timestep per day in NumPy, so a day costs about 1/60 of a
+    window pass. The first prediction equals the window model's; later ones see
+    the whole history instead of the last 60 days, so they can drift from the
+    window replay (see benchmarks/forecast_streaming.py).
+
+    Supports stacks of LSTM and Dense layers (Dropout is skipped at inference).
+    """
+
+    def __init__(self, model):
+        self.layers = []
+        for layer in model.layers:
+            kind = layer.__class__.__name__
+            config = layer.get_config()
+            if kind == "LSTM":
+                weights = layer.get_weights()
+                kernel, recurrent_kernel = weights[0], weights[1]
+                bias = weights[2] if config.get("use_bias", True) else np.zeros(kernel.shape[1], np.float32)
+                self.layers.append(("lstm", {
+                    "kernel": kernel.astype(np.float32),
+                    "recurrent_kernel": recurrent_kernel.astype(np.float32),
+                    "bias": bias.astype(np.float32),
+                    "units": recurrent_kernel.shape[0],
+                    "activation": _activation(config.get("activation", "tanh")),
+                    "recurrent_activation": _activation(config.get("recurrent_activation", "sigmoid")),
+                }))
+            elif kind == "Dense":
+                weights = layer.get_weights()
+                bias = weights[1] if len(weights) > 1 else np.zeros(weights[0].shape[1], np.float32)
+                self.layers.append(("dense", {
+                    "kernel": weights[0].astype(np.float32),
+                    "bias": bias.astype(np.float32),
+                    "activation": _activation(config.get("activation")),
+                }))
+            elif kind in ("Dropout", "InputLayer"):
+                continue
+            else:
+                raise ValueError(f"Unsupported layer for streaming: {kind}")
+        self._warm = {}
+
+    def initial_state(self):
+        return [(np.zeros(params["units"], np.float32), np.zeros(params["units"], np.float32))
+                if kind == "lstm" else None
+                for kind, params in self.layers]
+
+    def step(self, state, features):
+        """Advances the state by one timestep; returns (output, new_state)."""
+        x = np.asarray(features, dtype=np.float32)
+        new_state = []
+        for (kind, params), layer_state in zip(self.layers, state):
+            if kind == "lstm":
+                h, c = layer_state
+                z = x @ params["kernel"] + h @ params["recurrent_kernel"] + params["bias"]
+                i, f, g, o = np.split(z, 4)
+                c = params["recurrent_activation"](f) * c + params["recurrent_activation"](i) * params["activation"](g)
+                h = params["recurrent_activation"](o) * params["activation"](c)
+                x = h
+                new_state.append((h, c))
+            else:
+                x = params["activation"](x @ params["kernel"] + params["bias"])
+                new_state.append(None)
+        return x, new_state
+
+    def warm_up(self, window):
+        """Runs the seed window from a zero state; cached per window contents."""
+        window = np.asarray(window, dtype=np.float32)
+        key = window.tobytes()
+        if key not in self._warm:
+            state = self.initial_state()
+            for row in window:
+                output, state = self.step(state, row)
+            self._warm = {key: (output, state)}  # keep only the latest seed window
+        return self._warm[key]
+
+
+def predict_future_streaming(forecaster, last_60_scaled, days_to_predict, scaler,
+                             last_date=LAST_TRAIN_DATE, last_time_index=LAST_TIME_INDEX):
+    """Same forecast interface as predict_future, advanced with a StreamingForecaster."""
+    predictions_scaled = np.empty(days_to_predict, dtype=np.float64)
+    future_features = scaled_calendar_features(scaler, last_date, days_to_predict, last_time_index)
+
+    output, state = forecaster.warm_up(last_60_scaled)
+    for i in range(days_to_predict):
+        predictions_scaled[i] = output[0]
+        if i + 1 < days_to_predict:
+            next_features = future_features[i]
+            next_features[0] = output[0]
+            output, state = forecaster.step(state, next_features)
+
+    return inverse_transform_column(scaler, predictions_scaled)
+
+
+def artifact_fingerprint(model, scaler, seed_window, *extra):
+    """Hash of everything a forecast depends on: model weights, scaler and seed window."""
+    digest = hashlib.sha256()
+    for weights in model.get_weights():
+        digest.update(np.ascontiguousarray(weights).tobytes())
+    digest.update(pickle.dumps(scaler))
+    digest.update(np.ascontiguousarray(seed_window).tobytes())
+    for value in extra:
+        digest.update(repr(value).encode())
+    return digest.hexdigest()[:16]
+
+
+class ForecastTrajectory:
+    """The longest forecast, computed once and served by prefix.
+
+    Forecasts are deterministic and every shorter horizon is a prefix of the
+    longest one, so a date picker only needs to slice. The trajectory is computed
+    on first use and persisted to cache_dir under the artifact fingerprint, so a
+    new model, scaler or seed window invalidates it.
+    """
+
+    def __init__(self, compute, horizon_days, fingerprint, cache_dir=None):
+        self.compute = compute  # days -> array of AQI predictions
+        self.horizon_days = horizon_days
+        cache_dir = cache_dir or os.environ.get("FORECAST_CACHE_DIR", tempfile.gettempdir())
+        self.path = os.path.join(cache_dir, f"forecast_{fingerprint}_{horizon_days}.npy")
+        self._trajectory = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._trajectory is None:
+                if os.path.exists(self.path):
+                    self._trajectory = np.load(self.path)
+                else:
+                    self._trajectory = np.asarray(self.compute(self.horizon_days))
+                    self._save()
+            return self._trajectory
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, self._trajectory)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not persist forecast to {self.path}: {e}")
+
+    def prefix(self, days):
+        """The forecast for the first days after the last training date (last axis is days)."""
+        if days > self.horizon_days:
+            raise ValueError(f"Forecast horizon is {self.horizon_days} days, {days} requested")
+        return self.get()[..., :days]
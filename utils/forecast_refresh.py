@@ -0,0 +1,86 @@
+import glob
+import hashlib
+import os
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from utils.datasets import DATE_COLUMN
+from utils.forecast import calendar_features
+
+
+class SeedState(NamedTuple):
+    """The scaled 60-day window a forecast starts from and the day it ends on."""
+    window: np.ndarray
+    last_date: pd.Timestamp
+    last_time_index: int
+
+
+def _window_digest(window):
+    return hashlib.sha256(np.ascontiguousarray(window).tobytes()).hexdigest()[:16]
+
+
+def read_observations(directory, county, pollutant="pm25"):
+    """Daily mean AQI from the CSVs dropped in directory for a county and pollutant.
+
+    Files are matched as <county>_<pollutant>*.csv and need date_local and aqi
+    columns; several monitors on the same day are averaged, as in training.
+    """
+    paths = sorted(glob.glob(os.path.join(directory, f"{county}_{pollutant}*.csv")))
+    if not paths:
+        return pd.Series(dtype=np.float64)
+    observations = pd.concat(
+        [pd.read_csv(path, usecols=[DATE_COLUMN, "aqi"], parse_dates=[DATE_COLUMN]) for path in paths]
+    ).dropna()
+    return observations.groupby(DATE_COLUMN)["aqi"].mean().sort_index()
+
+
+def advance_seed(state, observations, scaler):
+    """Appends the observed days after state.last_date to the seed window.
+
+    Only the run of consecutive days directly after last_date is used, so the
+    window stays contiguous; a missing day stops the advance until it arrives.
+    Rows get the same calendar features as the rollout and are scaled with the
+    training scaler.
+    """
+    if observations.empty:
+        return state
+    new = observations[observations.index > state.last_date]
+    expected = pd.date_range(state.last_date + pd.Timedelta(days=1), periods=len(new), freq="D")
+    contiguous = np.flatnonzero(new.index != expected)
+    days = contiguous[0] if len(contiguous) else len(new)
+    if days == 0:
+        return state
+
+    rows = calendar_features(state.last_date, days, state.last_time_index)
+    rows[:, 0] = new.to_numpy()[:days]
+    window = np.concatenate([state.window, scaler.transform(rows)])[-len(state.window):]
+    return SeedState(window, state.last_date + pd.Timedelta(days=days), state.last_time_index + days)
+
+
+def refresh_seed(state, scaler, state_path, observations):
+    """Advances a trained seed state with observations, persisting the result.
+
+    Progress is saved to state_path so later loads start where the last one
+    stopped. The saved state remembers the digest of the seed it grew from and
+    is discarded when a new seed window is uploaded.
+    """
+    base_digest = _window_digest(state.window)
+    if os.path.exists(state_path):
+        saved = np.load(state_path, allow_pickle=False)
+        if str(saved["base_digest"]) == base_digest:
+            state = SeedState(saved["window"], pd.Timestamp(str(saved["last_date"])), int(saved["last_time_index"]))
+
+    advanced = advance_seed(state, observations, scaler)
+    if advanced.last_date != state.last_date:
+        os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+        tmp_path = f"{state_path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, window=advanced.window, last_date=str(advanced.last_date.date()),
+                 last_time_index=advanced.last_time_index, base_digest=base_digest)
+        os.replace(tmp_path, state_path)
+    return advanced
+
+
+def seed_state_path(directory, county, pollutant="pm25"):
+    return os.path.join(directory, f"seed_{county}_{pollutant}.npz")
@@ -0,0 +1,158 @@
+import gc
+import re
+import threading
+import time
+from typing import NamedTuple
+
+from utils.cache import LRUCache
+from utils.forecast import (LAST_TIME_INDEX, LAST_TRAIN_DATE, CompiledModel, ForecastTrajectory,
+                            StreamingForecaster, artifact_fingerprint, predict_future, predict_future_ensemble,
+                            predict_future_streaming)
+
+
+# Artifacts are uploaded as rigorous_<county>_<pollutant>_{lstm_model.h5,last_60_scaled.npy,scaler.pkl}
+MODEL_FILE_PATTERN = re.compile(r"^rigorous_(?P<county>.+)_(?P<pollutant>[a-z0-9]+)_lstm_model\.h5$")
+
+
+class ModelSpec(NamedTuple):
+    """Where one county/pollutant LSTM and its scaler and seed window live."""
+    county: str
+    pollutant: str
+    model_file: str
+    seed_file: str
+    scaler_file: str
+    last_train_date: object = LAST_TRAIN_DATE
+    last_time_index: int = LAST_TIME_INDEX
+
+    @property
+    def key(self):
+        return self.county, self.pollutant
+
+    @property
+    def county_name(self):
+        return self.county.replace("_", " ").title()
+
+    @classmethod
+    def for_county(cls, county, pollutant="pm25", **kwargs):
+        prefix = f"rigorous_{county}_{pollutant}"
+        return cls(county, pollutant, f"{prefix}_lstm_model.h5", f"{prefix}_last_60_scaled.npy",
+                   f"{prefix}_scaler.pkl", **kwargs)
+
+
+def discover_specs(file_names):
+    """Specs for every model in file_names that also has its seed window and scaler."""
+    file_names = set(file_names)
+    specs = {}
+    for name in sorted(file_names):
+        match = MODEL_FILE_PATTERN.match(name)
+        if match is None:
+            continue
+        spec = ModelSpec.for_county(match["county"], match["pollutant"])
+        if spec.seed_file in file_names and spec.scaler_file in file_names:
+            specs[spec.key] = spec
+    return specs
+
+
+class CountyForecast:
+    """A loaded county model with its cached point forecast and optional ensemble band."""
+
+    def __init__(self, spec, model, scaler, seed_window, horizon_days, mode="window",
+                 ensemble="off", ensemble_samples=100):
+        self.spec = spec
+        self.model = model
+        self.scaler = scaler
+        self.seed_window = seed_window
+        self.mode = mode
+        self.ensemble = ensemble
+        self.ensemble_samples = ensemble_samples
+        self.inference = CompiledModel(model)
+        if ensemble == "dropout" and not any(layer.__class__.__name__ == "Dropout" for layer in model.layers):
+            # MC-dropout needs dropout to sample from; without it the band has zero width
+            print(f"Forecast model for {spec.county_name} has no Dropout layers; "
+                  f"FORECAST_ENSEMBLE=dropout will give a zero-width band")
+        self.streaming = StreamingForecaster(model) if mode == "streaming" else None
+
+        fingerprint = artifact_fingerprint(model, scaler, seed_window, mode, spec.last_train_date)
+        self.forecast = ForecastTrajectory(self._compute, horizon_days, fingerprint)
+        self.band = ForecastTrajectory(
+            self._compute_band, horizon_days,
+            artifact_fingerprint(model, scaler, seed_window, ensemble, ensemble_samples, spec.last_train_date)
+        ) if ensemble != "off" else None
+
+    def _compute(self, num_days):
+        if self.streaming is not None:
+            return predict_future_streaming(self.streaming, self.seed_window, num_days, self.scaler,
+                                            self.spec.last_train_date, self.spec.last_time_index)
+        return predict_future(self.inference, self.seed_window, num_days, self.scaler,
+                              self.spec.last_train_date, self.spec.last_time_index)
+
+    def _compute_band(self, num_days):
+        return predict_future_ensemble(self.inference, self.seed_window, num_days, self.scaler,
+                                       n_samples=self.ensemble_samples, method=self.ensemble,
+                                       last_date=self.spec.last_train_date,
+                                       last_time_index=self.spec.last_time_index)
+
+
+def model_nbytes(loaded):
+    """Bytes of weights held by a loaded model, or by the Keras model a CountyForecast wraps."""
+    model = getattr(loaded, "model", loaded)
+    get_weights = getattr(model, "get_weights", None)
+    return sum(weights.nbytes for weights in get_weights()) if get_weights is not None else 0
+
+
+class ModelRegistry:
+    """Forecast models keyed by (county, pollutant), loaded on first use.
+
+    load(spec) builds a loaded model (for example a CountyForecast). At most
+    max_loaded of them are kept, least recently used first out, and models not
+    used for max_idle_seconds are unloaded by a background sweeper. Loaded
+    models are sized by their weights, so stats() reports the bytes they hold.
+    """
+
+    def __init__(self, specs, load, max_loaded=2, max_idle_seconds=None, sizeof=model_nbytes):
+        self.specs = dict(specs)
+        self.load = load
+        self.max_idle_seconds = max_idle_seconds
+        self._loaded = LRUCache(max_bytes=None, sizeof=sizeof, max_entries=max_loaded)
+        self._sweeper = None
+
+    def __contains__(self, key):
+        return key in self.specs
+
+    def counties(self, pollutant="pm25"):
+        return sorted((spec for spec in self.specs.values() if spec.pollutant == pollutant),
+                      key=lambda spec: spec.county)
+
+    def get(self, county, pollutant="pm25"):
+        key = (county, pollutant)
+        if key not in self.specs:
+            raise KeyError(f"No forecast model for {county} {pollutant}")
+        return self._loaded.get(key, lambda: self.load(self.specs[key]))
+
+    def is_loaded(self, county, pollutant="pm25"):
+        return (county, pollutant) in self._loaded
+
+    def unload_idle(self):
+        """Unloads models idle longer than max_idle_seconds; returns their keys."""
+        if self.max_idle_seconds is None:
+            return []
+        unloaded = self._loaded.evict_idle(self.max_idle_seconds)
+        if unloaded:
+            gc.collect()  # Keras models hold reference cycles
+        return unloaded
+
+    def start_idle_sweeper(self, interval_seconds=60):
+        """Runs unload_idle every interval_seconds on a daemon thread."""
+        if self.max_idle_seconds is None or self._sweeper is not None:
+            return
+
+        def sweep():
+            while True:
+                time.sleep(interval_seconds)
+                self.unload_idle()
+
+        self._sweeper = threading.Thread(target=sweep, name="forecast-model-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stats(self):
+        return self._loaded.stats()
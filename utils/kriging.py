@@ -0,0 +1,340 @@
+import numpy as np
+from scipy.linalg import lu_factor, lu_solve
+from scipy.spatial import cKDTree
+from scipy.spatial.distance import cdist
+
+from utils.cache import LRUCache
+from utils.distance import project_km, within_distance_mask
+
+
+# Variogram used for PM 2.5 AQI in San Joaquin Valley
+VARIOGRAM_MODEL = "spherical"
+VARIOGRAM_PARAMETERS = {"sill": 60, "range": 3500.0, "nugget": 5}
+
+# Predictions are only made within this distance of a monitor
+MAX_DISTANCE_KM = 200
+GRID_RESOLUTION = 0.05
+
+
+# Check if a point is within allowable prediction distance
+def is_within_distance(lon, lat, longitudes, latitudes, threshold_km=MAX_DISTANCE_KM):
+    return bool(within_distance_mask([lat], [lon], latitudes, longitudes, threshold_km)[0])
+
+
+# Helper function to create a grid of points
+def create_grid(min_lat, max_lat, min_lon, max_lon, resolution=GRID_RESOLUTION):
+    """Returns flat latitude and longitude arrays of a regular grid, latitude-major."""
+    lat_grid, lon_grid = np.meshgrid(np.arange(min_lat, max_lat, resolution),
+                                     np.arange(min_lon, max_lon, resolution),
+                                     indexing="ij")
+    return lat_grid.ravel(), lon_grid.ravel()
+
+
+def fit_kriging(longitudes, latitudes, values,
+                variogram_model=VARIOGRAM_MODEL,
+                variogram_parameters=VARIOGRAM_PARAMETERS):
+    """Fits an Ordinary Kriging model to the monitor values of a single day."""
+    from pykrige.ok import OrdinaryKriging  # deferred until the first fit
+
+    return OrdinaryKriging(
+        np.asarray(longitudes, dtype=float),
+        np.asarray(latitudes, dtype=float),
+        np.asarray(values, dtype=float),
+        variogram_model=variogram_model,
+        variogram_parameters=dict(variogram_parameters)
+    )
+
+
+class KrigingModel:
+    """A fitted Ordinary Kriging model whose kriging matrix is factorized once.
+
+    pykrige inverts the kriging matrix on every execute() call, so repeated
+    predictions for the same date (map renders, clicks) reuse the LU factors here.
+    """
+
+    def __init__(self, OK):
+        self.OK = OK
+        self.xy = np.column_stack((OK.X_ADJUSTED, OK.Y_ADJUSTED))
+        self.n = self.xy.shape[0]
+        self.matrix = OK._get_kriging_matrix(self.n)
+        self.lu = lu_factor(self.matrix)
+        self.fit_args = None
+        self._tree = None
+
+    @classmethod
+    def fit(cls, longitudes, latitudes, values,
+            variogram_model=VARIOGRAM_MODEL,
+            variogram_parameters=VARIOGRAM_PARAMETERS):
+        model = cls(fit_kriging(longitudes, latitudes, values, variogram_model, variogram_parameters))
+        # Kept so worker processes can refit the same model (see utils.kriging_pool)
+        model.fit_args = (np.asarray(longitudes, dtype=float), np.asarray(latitudes, dtype=float),
+                          np.asarray(values, dtype=float), variogram_model, dict(variogram_parameters))
+        return model
+
+    @property
+    def nbytes(self):
+        lu, piv = self.lu
+        return self.matrix.nbytes + lu.nbytes + piv.nbytes + self.xy.nbytes + np.asarray(self.OK.Z).nbytes
+
+    @property
+    def station_tree(self):
+        """KD-tree of the monitors in km, projected around their mean latitude (built once)."""
+        if self._tree is None:
+            self.origin_lat = float(np.mean(self.OK.Y_ORIG))
+            self._tree = cKDTree(project_km(self.OK.X_ORIG, self.OK.Y_ORIG, self.origin_lat))
+        return self._tree
+
+    def _right_hand_side(self, longitudes, latitudes, stations=None):
+        """Builds the kriging right-hand sides, one column per point, as pykrige does.
+
+        stations optionally restricts the system to a subset of monitor indices.
+        """
+        from pykrige.core import _adjust_for_anisotropy
+
+        OK = self.OK
+        xy = self.xy if stations is None else self.xy[stations]
+        n = xy.shape[0]
+        points = _adjust_for_anisotropy(
+            np.column_stack((longitudes, latitudes)),
+            [OK.XCENTER, OK.YCENTER],
+            [OK.anisotropy_scaling],
+            [OK.anisotropy_angle]
+        )
+        bd = cdist(points, xy, "euclidean").T
+        b = np.empty((n + 1, bd.shape[1]))
+        b[:n] = -OK.variogram_function(OK.variogram_model_parameters, bd)
+        if OK.exact_values:
+            b[:n][np.absolute(bd) <= OK.eps] = 0.0
+        b[n] = 1.0
+        return b
+
+    def predict(self, longitudes, latitudes, n_closest=None, radius_km=None):
+        """Returns predictions and kriging variances, matching OrdinaryKriging.execute("points").
+
+        Passing n_closest and/or radius_km switches to moving-window Kriging, where
+        each point only uses its nearest monitors (see _predict_local).
+        """
+        longitudes = np.asarray(longitudes, dtype=float).ravel()
+        latitudes = np.asarray(latitudes, dtype=float).ravel()
+        if longitudes.size == 0:
+            return np.empty(0), np.empty(0)
+        if n_closest is not None or radius_km is not None:
+            return self._predict_local(longitudes, latitudes, n_closest, radius_km)
+
+        b = self._right_hand_side(longitudes, latitudes)
+        weights = lu_solve(self.lu, b)
+        predictions = weights[:self.n].T @ np.asarray(self.OK.Z, dtype=float)
+        variances = np.sum(weights * -b, axis=0)
+        return predictions, variances
+
+    def _predict_local(self, longitudes, latitudes, n_closest, radius_km):
+        """Moving-window Kriging using the n_closest monitors and/or those within radius_km.
+
+        Points sharing the same set of neighbours are solved together against one
+        factorized sub-system, so the cost per point depends on the window size
+        rather than on the number of monitors in the network.
+        """
+        tree = self.station_tree
+        points = project_km(longitudes, latitudes, self.origin_lat)
+
+        if n_closest is not None:
+            k = min(int(n_closest), self.n)
+            distances, indices = tree.query(points, k=k,
+                                            distance_upper_bound=np.inf if radius_km is None else radius_km)
+            indices = indices.reshape(len(points), k)
+            # Missing neighbours beyond the radius come back with index self.n
+            neighbours = [tuple(sorted(row[row < self.n])) for row in indices]
+        else:
+            neighbours = [tuple(sorted(row)) for row in tree.query_ball_point(points, r=radius_km)]
+
+        groups = {}
+        for i, stations in enumerate(neighbours):
+            groups.setdefault(stations, []).append(i)
+
+        Z = np.asarray(self.OK.Z, dtype=float)
+        predictions = np.full(len(points), np.nan)
+        variances = np.full(len(points), np.nan)
+        for stations, members in groups.items():
+            if not stations:
+                continue
+            stations = np.array(stations)
+            members = np.array(members)
+            rows = np.append(stations, self.n)  # keep the unbiasedness constraint row
+            lu = lu_factor(self.matrix[np.ix_(rows, rows)])
+            b = self._right_hand_side(longitudes[members], latitudes[members], stations)
+            weights = lu_solve(lu, b)
+            predictions[members] = weights[:-1].T @ Z[stations]
+            variances[members] = np.sum(weights * -b, axis=0)
+        return predictions, variances
+
+
+class KrigingCache(LRUCache):
+    """Thread-safe LRU cache of fitted Kriging models keyed by date and variogram.
+
+    Least recently used dates are evicted once the cached models exceed max_bytes.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        super().__init__(max_bytes)
+
+    @staticmethod
+    def make_key(date, variogram_model=VARIOGRAM_MODEL, variogram_parameters=VARIOGRAM_PARAMETERS):
+        return (str(date), variogram_model, tuple(sorted(variogram_parameters.items())))
+
+    def get(self, date, longitudes, latitudes, values,
+            variogram_model=VARIOGRAM_MODEL,
+            variogram_parameters=VARIOGRAM_PARAMETERS):
+        """Returns the cached model for the date, fitting it from the monitor values on a miss."""
+        return super().get(
+            self.make_key(date, variogram_model, variogram_parameters),
+            lambda: KrigingModel.fit(longitudes, latitudes, values, variogram_model, variogram_parameters)
+        )
+
+
+class KrigingSurface:
+    """Kriging predictions and variances on a regular latitude/longitude grid.
+
+    Cells farther than the distance limit from every monitor hold NaN.
+    """
+
+    def __init__(self, bounds, resolution, predictions, variances):
+        self.bounds = tuple(float(b) for b in bounds)  # (min_lat, max_lat, min_lon, max_lon)
+        self.resolution = float(resolution)
+        self.predictions = predictions
+        self.variances = variances
+
+    @property
+    def latitudes(self):
+        min_lat, max_lat, _, _ = self.bounds
+        return np.arange(min_lat, max_lat, self.resolution)
+
+    @property
+    def longitudes(self):
+        _, _, min_lon, max_lon = self.bounds
+        return np.arange(min_lon, max_lon, self.resolution)
+
+    @property
+    def shape(self):
+        return (self.latitudes.size, self.longitudes.size)
+
+    @property
+    def nbytes(self):
+        return np.asarray(self.predictions).nbytes + np.asarray(self.variances).nbytes
+
+    def points(self):
+        """Returns latitudes, longitudes, predictions and variances of the in-range cells."""
+        grid_lats, grid_lons = create_grid(*self.bounds, resolution=self.resolution)
+        in_range = ~np.isnan(np.asarray(self.predictions)).ravel()
+        return (grid_lats[in_range], grid_lons[in_range],
+                np.asarray(self.predictions).ravel()[in_range], np.asarray(self.variances).ravel()[in_range])
+
+
+def _predict(model, longitudes, latitudes, n_closest=None, radius_km=None, pool=None):
+    if pool is None:
+        return model.predict(longitudes, latitudes, n_closest=n_closest, radius_km=radius_km)
+    return pool.predict(model, longitudes, latitudes, n_closest=n_closest, radius_km=radius_km)
+
+
+def krige_surface(model, longitudes, latitudes, resolution=GRID_RESOLUTION, threshold_km=MAX_DISTANCE_KM,
+                  n_closest=None, radius_km=None, pool=None):
+    """Predicts over the bounding box of the monitors at the given resolution.
+
+    pool is an optional utils.kriging_pool.KrigingPool to spread the grid over processes.
+    """
+    bounds = (np.min(latitudes), np.max(latitudes), np.min(longitudes), np.max(longitudes))
+    grid_lats, grid_lons = create_grid(*bounds, resolution=resolution)
+    surface = KrigingSurface(bounds, resolution, None, None)
+
+    in_range = within_distance_mask(grid_lats, grid_lons, latitudes, longitudes, threshold_km)
+
+    predictions = np.full(grid_lats.size, np.nan)
+    variances = np.full(grid_lats.size, np.nan)
+    predictions[in_range], variances[in_range] = _predict(
+        model, grid_lons[in_range], grid_lats[in_range], n_closest, radius_km, pool)
+    surface.predictions = predictions.reshape(surface.shape)
+    surface.variances = variances.reshape(surface.shape)
+    return surface
+
+
+def _coarse_index(size, step):
+    """Indices of the coarse nodes along one fine axis, always including both ends."""
+    return np.unique(np.append(np.arange(0, size, step), size - 1))
+
+
+def _bilinear(coarse, rows, cols, fine_rows, fine_cols):
+    """Bilinearly interpolates coarse node values at the fine grid indices."""
+    k = np.clip(np.searchsorted(rows, fine_rows, side="right") - 1, 0, len(rows) - 2)
+    l = np.clip(np.searchsorted(cols, fine_cols, side="right") - 1, 0, len(cols) - 2)
+    t = ((fine_rows - rows[k]) / (rows[k + 1] - rows[k]))[:, None]
+    u = ((fine_cols - cols[l]) / (cols[l + 1] - cols[l]))[None, :]
+    k, l = k[:, None], l[None, :]
+    return ((1 - t) * (1 - u) * coarse[k, l] + (1 - t) * u * coarse[k, l + 1]
+            + t * (1 - u) * coarse[k + 1, l] + t * u * coarse[k + 1, l + 1])
+
+
+def adaptive_krige_surface(model, longitudes, latitudes, resolution=GRID_RESOLUTION, threshold_km=MAX_DISTANCE_KM,
+                           coarse_factor=4, gradient_threshold=5.0, variance_quantile=0.75,
+                           n_closest=None, radius_km=None, pool=None):
+    """Predicts a surface at the given resolution, kriging only where it matters.
+
+    The surface is first kriged on a grid coarse_factor times coarser. A coarse
+    cell is refined (every fine point inside it kriged) when its corner
+    predictions differ by more than gradient_threshold AQI, when a corner
+    variance is above the variance_quantile of the coarse variances, or when it
+    touches the distance limit. All other fine points are bilinearly interpolated.
+    The number of kriged points is stored on the result as n_kriged.
+    """
+    bounds = (np.min(latitudes), np.max(latitudes), np.min(longitudes), np.max(longitudes))
+    surface = KrigingSurface(bounds, resolution, None, None)
+    fine_lats, fine_lons = surface.latitudes, surface.longitudes
+    rows = _coarse_index(fine_lats.size, coarse_factor)
+    cols = _coarse_index(fine_lons.size, coarse_factor)
+
+    grid_lats, grid_lons = np.meshgrid(fine_lats, fine_lons, indexing="ij")
+    in_range = within_distance_mask(grid_lats.ravel(), grid_lons.ravel(),
+                                    latitudes, longitudes, threshold_km).reshape(surface.shape)
+
+    if rows.size < 2 or cols.size < 2:
+        refine = np.ones(surface.shape, dtype=bool)
+        predictions = np.full(surface.shape, np.nan)
+        variances = np.full(surface.shape, np.nan)
+    else:
+        # Coarse pass
+        coarse_in_range = in_range[np.ix_(rows, cols)]
+        coarse_pred = np.full(coarse_in_range.shape, np.nan)
+        coarse_var = np.full(coarse_in_range.shape, np.nan)
+        coarse_pred[coarse_in_range], coarse_var[coarse_in_range] = _predict(
+            model, grid_lons[np.ix_(rows, cols)][coarse_in_range], grid_lats[np.ix_(rows, cols)][coarse_in_range],
+            n_closest, radius_km, pool)
+
+        # Flag coarse cells by the spread, variance and validity of their corners
+        corners = np.stack([coarse_pred[:-1, :-1], coarse_pred[:-1, 1:], coarse_pred[1:, :-1], coarse_pred[1:, 1:]])
+        corner_vars = np.stack([coarse_var[:-1, :-1], coarse_var[:-1, 1:], coarse_var[1:, :-1], coarse_var[1:, 1:]])
+        incomplete = np.isnan(corners).any(axis=0)
+        with np.errstate(invalid="ignore"):
+            spread = np.where(incomplete, np.inf, corners.max(axis=0) - corners.min(axis=0))
+            uncertain = np.where(incomplete, np.inf, corner_vars.max(axis=0))
+        variance_threshold = (np.nanquantile(coarse_var, variance_quantile)
+                              if np.isfinite(coarse_var).any() else np.inf)
+        flagged = (spread > gradient_threshold) | (uncertain > variance_threshold)
+
+        # Map every fine point to its coarse cell and interpolate the unflagged ones
+        fine_rows, fine_cols = np.arange(fine_lats.size), np.arange(fine_lons.size)
+        cell_rows = np.clip(np.searchsorted(rows, fine_rows, side="right") - 1, 0, len(rows) - 2)
+        cell_cols = np.clip(np.searchsorted(cols, fine_cols, side="right") - 1, 0, len(cols) - 2)
+        refine = flagged[np.ix_(cell_rows, cell_cols)]
+        with np.errstate(invalid="ignore"):
+            predictions = _bilinear(coarse_pred, rows, cols, fine_rows, fine_cols)
+            variances = _bilinear(coarse_var, rows, cols, fine_rows, fine_cols)
+
+    # Fine pass over the flagged cells only
+    refine &= in_range
+    predictions[refine], variances[refine] = _predict(
+        model, grid_lons[refine], grid_lats[refine], n_closest, radius_km, pool)
+    predictions[~in_range] = np.nan
+    variances[~in_range] = np.nan
+
+    surface.predictions = predictions
+    surface.variances = variances
+    surface.n_kriged = int(refine.sum()) + (0 if rows.size < 2 or cols.size < 2 else int(coarse_in_range.sum()))
+    return surface
@@ -0,0 +1,88 @@
+import hashlib
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.kriging import KrigingCache
+
+
+DEFAULT_TILE_SIZE = 2048
+
+# Each worker process keeps its own fitted models, so a date is fitted once per worker
+_worker_cache = None
+
+
+def _fit_key(fit_args):
+    """Identifies a fit by the monitor data and variogram it was built from."""
+    longitudes, latitudes, values, variogram_model, variogram_parameters = fit_args
+    digest = hashlib.sha1()
+    for array in (longitudes, latitudes, values):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    digest.update(repr((variogram_model, sorted(variogram_parameters.items()))).encode())
+    return digest.hexdigest()
+
+
+def _predict_tile(task):
+    """Worker entry point: kriges one tile of grid points."""
+    global _worker_cache
+    if _worker_cache is None:
+        _worker_cache = KrigingCache(max_bytes=16 * 1024 * 1024)
+
+    fit_key, fit_args, longitudes, latitudes, n_closest, radius_km = task
+    model = _worker_cache.get(fit_key, *fit_args)
+    return model.predict(longitudes, latitudes, n_closest=n_closest, radius_km=radius_km)
+
+
+class KrigingPool:
+    """Evaluates Kriging predictions in tiles across a process pool.
+
+    Tasks carry only the monitor arrays of the day (a few hundred floats) and
+    their tile of grid coordinates; workers refit and cache the model themselves.
+    With max_workers <= 1, or grids smaller than one tile, it runs serially.
+
+    The pool is meant for the gunicorn deployment (app.yaml), where spawned
+    workers import only utils. Under `python app.py` they re-import the script
+    as __mp_main__, which app.py guards so they do not boot a second app, and
+    the debug reloader restarts them with every code change.
+    """
+
+    def __init__(self, max_workers=1, tile_size=DEFAULT_TILE_SIZE):
+        self.max_workers = max_workers
+        self.tile_size = tile_size
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn avoids forking the web server's threads into the workers
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def predict(self, model, longitudes, latitudes, n_closest=None, radius_km=None):
+        """Same as model.predict, with the points split into tiles across processes."""
+        longitudes = np.asarray(longitudes, dtype=float).ravel()
+        latitudes = np.asarray(latitudes, dtype=float).ravel()
+        if self.max_workers <= 1 or longitudes.size <= self.tile_size or model.fit_args is None:
+            return model.predict(longitudes, latitudes, n_closest=n_closest, radius_km=radius_km)
+
+        fit_key = _fit_key(model.fit_args)
+        tasks = [
+            (fit_key, model.fit_args,
+             longitudes[start:start + self.tile_size], latitudes[start:start + self.tile_size],
+             n_closest, radius_km)
+            for start in range(0, longitudes.size, self.tile_size)
+        ]
+        # map() yields results in task order, so tiles reassemble in grid order
+        results = list(self._get_executor().map(_predict_tile, tasks))
+        return (np.concatenate([predictions for predictions, _ in results]),
+                np.concatenate([variances for _, variances in results]))
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
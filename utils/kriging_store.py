@@ -0,0 +1,96 @@
+"""On-disk store of precomputed Kriging surfaces, one memory-mapped array per date.
+
+Build it once from the daily PM 2.5 data, using every core:
+
+    python -m utils.kriging_store sjv_pm25_daily_df.csv kriging_store
+
+The store directory holds index.json plus a float32 .npy file per date with
+shape (2, n_lat, n_lon): predictions first, kriging variances second.
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from utils.kriging import GRID_RESOLUTION, KrigingModel, KrigingSurface, krige_surface
+
+
+INDEX_FILE = "index.json"
+
+
+def build_date(directory, date, longitudes, latitudes, values, resolution=GRID_RESOLUTION):
+    """Kriges one date, writes its arrays and returns the index entry."""
+    model = KrigingModel.fit(longitudes, latitudes, values)
+    surface = krige_surface(model, longitudes, latitudes, resolution=resolution)
+
+    file_name = f"{date}.npy"
+    np.save(os.path.join(directory, file_name),
+            np.stack([surface.predictions, surface.variances]).astype(np.float32))
+    return {"file": file_name, "bounds": list(surface.bounds), "resolution": surface.resolution}
+
+
+def build_store(df, directory, resolution=GRID_RESOLUTION, max_workers=None):
+    """Precomputes the surface of every date in df across a process pool."""
+    os.makedirs(directory, exist_ok=True)
+    df = df.dropna(subset=["latitude", "longitude", "aqi"])
+
+    index = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(build_date, directory, date,
+                            day["longitude"].values, day["latitude"].values, day["aqi"].values,
+                            resolution): date
+            for date, day in df.groupby("date_local")
+        }
+        for future in as_completed(futures):
+            date = futures[future]
+            try:
+                index[date] = future.result()
+            except Exception as e:
+                print(f"Skipping {date}: {e}")
+
+    with open(os.path.join(directory, INDEX_FILE), "w") as f:
+        json.dump(dict(sorted(index.items())), f)
+    return index
+
+
+class SurfaceStore:
+    """Read-only access to a store written by build_store."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, INDEX_FILE)) as f:
+            self.index = json.load(f)
+
+    @classmethod
+    def open(cls, directory):
+        """Returns the store in directory, or None if it has not been built."""
+        if not os.path.exists(os.path.join(directory, INDEX_FILE)):
+            return None
+        return cls(directory)
+
+    def __contains__(self, date):
+        return str(date) in self.index
+
+    def get(self, date):
+        """Returns the precomputed KrigingSurface for the date, or None."""
+        entry = self.index.get(str(date))
+        if entry is None:
+            return None
+        arrays = np.load(os.path.join(self.directory, entry["file"]), mmap_mode="r")
+        return KrigingSurface(entry["bounds"], entry["resolution"], arrays[0], arrays[1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute Kriging surfaces for every date.")
+    parser.add_argument("csv", help="path to sjv_pm25_daily_df.csv")
+    parser.add_argument("directory", help="output store directory")
+    parser.add_argument("--resolution", type=float, default=GRID_RESOLUTION)
+    parser.add_argument("--workers", type=int, default=None, help="processes to use (default: all cores)")
+    args = parser.parse_args()
+
+    built = build_store(pd.read_csv(args.csv), args.directory, args.resolution, args.workers)
+    print(f"Wrote {len(built)} surfaces to {args.directory}")
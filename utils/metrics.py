@@ -0,0 +1,173 @@
+"""In-process metrics for Dash callbacks, served in the Prometheus text format.
+
+Callbacks are wrapped with callback_metrics.instrument() under their @callback
+decorator; caches register a stats() function. app.py serves everything at
+/metrics on the Flask server and measures callback responses as Flask sends
+them. CALLBACK_METRICS=0 turns the instrumentation off.
+"""
+import bisect
+import functools
+import logging
+import os
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus expects."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f"{name}_sum{{{labels}}} {self.sum}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class CallbackMetrics:
+    """Latency and response-size histograms, exception counts and cache stats."""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._latency = {}  # callback -> Histogram
+        self._size = {}  # output id -> Histogram
+        self._exceptions = {}  # (callback, exception type) -> count
+        self._caches = {}  # name -> stats() returning a dict or None
+        self._lock = threading.Lock()
+
+    def instrument(self, fallback=None):
+        """Decorator recording latency and exceptions of a callback.
+
+        With fallback, an exception is logged and counted and fallback() is
+        returned instead; otherwise it is counted and re-raised. PreventUpdate
+        and other Dash control-flow exceptions are not counted.
+        """
+        def decorator(func):
+            if not self.enabled:
+                return func
+            name = func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    output = func(*args, **kwargs)
+                except Exception as e:
+                    if type(e).__module__.startswith("dash"):
+                        raise
+                    if fallback is None:
+                        self._count_exception(name, e)
+                        raise
+                    self.record_exception(name, e)
+                    output = fallback()
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self._latency.setdefault(name, Histogram(LATENCY_BUCKETS)).observe(elapsed)
+                return output
+
+            return wrapper
+        return decorator
+
+    def _count_exception(self, name, exception):
+        key = (name, type(exception).__name__)
+        with self._lock:
+            self._exceptions[key] = self._exceptions.get(key, 0) + 1
+
+    def record_exception(self, name, exception):
+        """Counts and logs an exception a callback handled itself."""
+        self._count_exception(name, exception)
+        logger.error("Error in %s", name, exc_info=exception)
+
+    def record_response(self, request, response):
+        """Flask after_request hook: records the size of Dash callback responses.
+
+        The body Flask sends is measured, keyed by the callback's output id, so
+        nothing is serialized a second time.
+        """
+        if (self.enabled and request.path.endswith("/_dash-update-component")
+                and response.status_code == 200 and not response.direct_passthrough):
+            body = request.get_json(silent=True) or {}
+            output = body.get("output", "unknown")
+            size = len(response.get_data())
+            with self._lock:
+                self._size.setdefault(output, Histogram(SIZE_BUCKETS)).observe(size)
+        return response
+
+    def register_cache(self, name, stats):
+        """Exports a cache's stats() (hits, misses, entries, bytes) under name."""
+        self._caches[name] = stats
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            lines += ["# HELP dash_callback_duration_seconds Callback latency.",
+                      "# TYPE dash_callback_duration_seconds histogram"]
+            for name, histogram in sorted(self._latency.items()):
+                lines += histogram.lines("dash_callback_duration_seconds", f'callback="{_escape(name)}"')
+            lines += ["# HELP dash_callback_response_bytes Size of Dash callback response bodies, by output.",
+                      "# TYPE dash_callback_response_bytes histogram"]
+            for output, histogram in sorted(self._size.items()):
+                lines += histogram.lines("dash_callback_response_bytes", f'output="{_escape(output)}"')
+            lines += ["# HELP dash_callback_exceptions_total Exceptions raised by callbacks.",
+                      "# TYPE dash_callback_exceptions_total counter"]
+            for (name, exception), count in sorted(self._exceptions.items()):
+                lines.append(f'dash_callback_exceptions_total{{callback="{_escape(name)}",'
+                             f'exception="{_escape(exception)}"}} {count}')
+
+        cache_stats = {}
+        for name, stats in sorted(self._caches.items()):
+            try:
+                values = stats()
+            except Exception:
+                logger.exception("Could not read stats of cache %s", name)
+                continue
+            if values is not None:
+                cache_stats[name] = values
+        for metric, kind, key, help_text in (
+                ("cache_hits_total", "counter", "hits", "Cache lookups served from the cache."),
+                ("cache_misses_total", "counter", "misses", "Cache lookups that had to build the value."),
+                ("cache_entries", "gauge", "entries", "Entries currently cached."),
+                ("cache_bytes", "gauge", "bytes", "Size of the cached entries.")):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+            lines += [f'{metric}{{cache="{_escape(name)}"}} {values[key]}'
+                      for name, values in cache_stats.items() if key in values]
+        lines += ["# HELP cache_hit_ratio Hits over lookups since start.", "# TYPE cache_hit_ratio gauge"]
+        for name, values in cache_stats.items():
+            lookups = values.get("hits", 0) + values.get("misses", 0)
+            if lookups:
+                lines.append(f'cache_hit_ratio{{cache="{_escape(name)}"}} {values["hits"] / lookups:.4f}')
+        return "\n".join(lines) + "\n"
+
+    def register_route(self, server, route="/metrics"):
+        """Serves render() on the Flask server and measures callback responses."""
+        from flask import Response, request
+
+        server.add_url_rule(route, "metrics",
+                            lambda: Response(self.render(), mimetype="text/plain; version=0.0.4"))
+        server.after_request(lambda response: self.record_response(request, response))
+
+
+callback_metrics = CallbackMetrics(enabled=os.environ.get("CALLBACK_METRICS", "1") == "1")
@@ -0,0 +1,43 @@
+import numpy as np
+import plotly.graph_objs as go
+
+
+def banded_line_traces(x, y, color_of, width=3):
+    """Draws a line coloured segment by segment with one trace per colour.
+
+    Each segment (x[i], x[i + 1]) is coloured by its mean value. color_of maps the
+    array of segment means to an array of colours in one call (e.g. utils.aqi.aqi_color).
+    Consecutive segments of the same colour are merged into one run, and runs of a
+    colour are separated by None gaps.
+    """
+    y = np.asarray(y, dtype=float)
+    segment_colors = color_of((y[:-1] + y[1:]) / 2)
+
+    runs = {}  # colour -> (xs, ys), in order of first appearance
+    previous_color = None
+    for i, color in enumerate(segment_colors):
+        xs, ys = runs.setdefault(color, ([], []))
+        if color == previous_color:
+            xs.append(x[i + 1])
+            ys.append(y[i + 1])
+        else:
+            if xs:
+                xs.append(None)
+                ys.append(None)
+            xs.extend([x[i], x[i + 1]])
+            ys.extend([y[i], y[i + 1]])
+        previous_color = color
+
+    return [
+        go.Scatter(x=xs, y=ys, mode='lines', line=dict(color=color, width=width), showlegend=False)
+        for color, (xs, ys) in runs.items()
+    ]
+
+
+def quantile_band_traces(x, lower, upper, color='rgba(44, 62, 80, 0.2)', name='90% interval'):
+    """A filled band between lower and upper; add it before the line it surrounds."""
+    return [
+        go.Scatter(x=x, y=upper, mode='lines', line=dict(width=0), hoverinfo='skip', showlegend=False),
+        go.Scatter(x=x, y=lower, mode='lines', line=dict(width=0), fill='tonexty', fillcolor=color,
+                   name=name, hovertemplate='%{y:.1f}', showlegend=False),
+    ]
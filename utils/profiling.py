@@ -0,0 +1,170 @@
+"""Startup instrumentation: wall time and memory of imports, downloads and parses.
+
+Enabled with STARTUP_PROFILE=1. app.py installs the profiler before importing
+Dash; page imports, heavy library imports, artifact downloads, parses and
+startup loads are then recorded as spans. The report is written as JSON to
+STARTUP_PROFILE_PATH (default: startup_profile.json in the temp dir), printed as
+a table, and with STARTUP_PROFILE_ROUTE=1 also served at /_diagnostics/startup.
+"""
+import contextlib
+import importlib.machinery
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+
+# Top-level libraries whose first import is timed
+HEAVY_IMPORTS = {
+    "dash", "flask", "numpy", "pandas", "plotly", "pyarrow", "scipy", "sklearn", "geopandas", "shapely",
+    "pykrige", "statsmodels", "tensorflow", "keras", "joblib", "google.cloud.storage",
+}
+MB = 1024 * 1024
+
+
+def current_rss():
+    """Resident set size of the process in bytes (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return peak_rss()
+
+
+def peak_rss():
+    """Peak resident set size of the process in bytes (0 if unknown)."""
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # kilobytes on Linux
+
+
+class StartupProfiler:
+    """Records timed spans with RSS before and after and the peak RSS so far.
+
+    Spans may overlap (concurrent startup loads, nested imports); times are
+    inclusive and memory deltas of overlapping spans include each other's.
+    When disabled, span() is a no-op.
+    """
+
+    def __init__(self, enabled=False, path=None):
+        self.enabled = enabled
+        self.path = path or os.path.join(tempfile.gettempdir(), "startup_profile.json")
+        self.spans = []
+        self._started = time.perf_counter()
+        self._started_at = datetime.now(timezone.utc)
+        self._lock = threading.Lock()
+        self._installed = False
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.environ.get("STARTUP_PROFILE", "0") == "1", os.environ.get("STARTUP_PROFILE_PATH"))
+
+    def span(self, kind, name):
+        return self._span(kind, name) if self.enabled else contextlib.nullcontext()
+
+    @contextlib.contextmanager
+    def _span(self, kind, name):
+        rss_before = current_rss()
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            span = {
+                "kind": kind,
+                "name": name,
+                "start": round(start - self._started, 4),
+                "seconds": round(time.perf_counter() - start, 4),
+                "rss_before_mb": round(rss_before / MB, 1),
+                "rss_after_mb": round(current_rss() / MB, 1),
+                "peak_rss_mb": round(peak_rss() / MB, 1),
+                "thread": threading.current_thread().name,
+            }
+            if error:
+                span["error"] = error
+            with self._lock:
+                self.spans.append(span)
+
+    def install(self):
+        """Times page modules and the first import of HEAVY_IMPORTS.
+
+        Dash loads pages with spec_from_file_location and exec_module, which skips
+        import hooks, so source module execution itself is wrapped.
+        """
+        if not self.enabled or self._installed:
+            return
+        self._installed = True
+        profiler = self
+        exec_module = importlib.machinery.SourceFileLoader.exec_module
+
+        def timed_exec_module(loader, module):
+            name = module.__name__
+            if name.startswith("pages."):
+                kind = "page import"
+            elif name in HEAVY_IMPORTS:
+                kind = "import"
+            else:
+                return exec_module(loader, module)
+            with profiler.span(kind, name):
+                return exec_module(loader, module)
+
+        importlib.machinery.SourceFileLoader.exec_module = timed_exec_module
+
+    def report(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["start"])
+        return {
+            "started_at": self._started_at.isoformat(),
+            "elapsed_seconds": round(time.perf_counter() - self._started, 3),
+            "rss_mb": round(current_rss() / MB, 1),
+            "peak_rss_mb": round(peak_rss() / MB, 1),
+            "spans": spans,
+        }
+
+    def table(self, report=None):
+        report = report or self.report()
+        lines = [f"{'kind':12s} {'name':48s} {'start':>8s} {'seconds':>8s} {'rss +MB':>8s} {'peak MB':>8s}"]
+        for span in report["spans"]:
+            lines.append(f"{span['kind']:12s} {span['name'][:48]:48s} {span['start']:8.2f} {span['seconds']:8.2f} "
+                         f"{span['rss_after_mb'] - span['rss_before_mb']:8.1f} {span['peak_rss_mb']:8.1f}"
+                         + (f"  {span['error']}" if "error" in span else ""))
+        lines.append(f"elapsed {report['elapsed_seconds']:.2f} s, rss {report['rss_mb']:.1f} MB, "
+                     f"peak {report['peak_rss_mb']:.1f} MB")
+        return "\n".join(lines)
+
+    def dump(self, label="startup"):
+        """Writes the JSON report and prints the table."""
+        if not self.enabled:
+            return
+        report = self.report()
+        try:
+            with open(self.path, "w") as f:
+                json.dump(report, f, indent=2)
+        except OSError as e:
+            print(f"Could not write startup profile to {self.path}: {e}")
+        print(f"{label} profile ({self.path}):\n{self.table(report)}")
+
+    def register_route(self, server, route="/_diagnostics/startup"):
+        """Serves the report on the Flask server (JSON, or a table with ?format=text)."""
+        if not self.enabled:
+            return
+        from flask import Response, jsonify, request
+
+        def startup_profile():
+            if request.args.get("format") == "text":
+                return Response(self.table(), mimetype="text/plain")
+            return jsonify(self.report())
+
+        server.add_url_rule(route, "startup_profile", startup_profile)
+
+
+profiler = StartupProfiler.from_env()
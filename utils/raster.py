@@ -0,0 +1,80 @@
+import base64
+import struct
+import zlib
+
+import numpy as np
+import plotly.colors
+
+
+def _colorscale_stops(colorscale):
+    """Returns stop positions and an (n, 3) array of RGB values for a Plotly colorscale."""
+    if isinstance(colorscale, str):
+        colorscale = plotly.colors.get_colorscale(colorscale)
+    positions, colors = [], []
+    for position, color in colorscale:
+        if color.startswith("#"):
+            rgb = plotly.colors.hex_to_rgb(color)
+        else:
+            rgb = plotly.colors.unlabel_rgb(color)
+        positions.append(float(position))
+        colors.append(rgb[:3])
+    return np.array(positions), np.array(colors, dtype=float)
+
+
+def colorize(values, colorscale="Viridis", cmin=None, cmax=None, opacity=1.0):
+    """Maps a 2-D array of values to RGBA pixels; NaN cells become transparent.
+
+    Like Plotly markers, the colour range defaults to the min and max of the data.
+    """
+    values = np.asarray(values, dtype=float)
+    valid = np.isfinite(values)
+    rgba = np.zeros(values.shape + (4,), dtype=np.uint8)
+    if not valid.any():
+        return rgba
+
+    cmin = np.nanmin(values) if cmin is None else cmin
+    cmax = np.nanmax(values) if cmax is None else cmax
+    scaled = np.clip((values[valid] - cmin) / ((cmax - cmin) or 1.0), 0.0, 1.0)
+
+    positions, colors = _colorscale_stops(colorscale)
+    for channel in range(3):
+        rgba[..., channel][valid] = np.round(np.interp(scaled, positions, colors[:, channel]))
+    rgba[..., 3][valid] = round(255 * opacity)
+    return rgba
+
+
+def encode_png(rgba):
+    """Encodes an (height, width, 4) uint8 array as PNG bytes, without extra dependencies."""
+    height, width, _ = rgba.shape
+    # Every scanline starts with filter type 0 (none)
+    raw = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    raw[:, 1:] = rgba.reshape(height, width * 4)
+
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)  # 8-bit RGBA
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)) + chunk(b"IEND", b""))
+
+
+def surface_image_layer(surface, values=None, colorscale="Viridis", cmin=None, cmax=None, opacity=0.3):
+    """Rasterizes a KrigingSurface into a mapbox image layer (one PNG, base64-encoded).
+
+    Each grid node becomes one pixel centred on the node. values defaults to the
+    predictions; pass surface.variances for an uncertainty layer.
+    """
+    values = np.asarray(surface.predictions if values is None else values, dtype=float)
+    # PNG rows run top to bottom, i.e. from the northernmost latitude down
+    png = encode_png(colorize(values[::-1], colorscale, cmin, cmax, opacity))
+
+    latitudes, longitudes = surface.latitudes, surface.longitudes
+    half = surface.resolution / 2
+    west, east = longitudes[0] - half, longitudes[-1] + half
+    south, north = latitudes[0] - half, latitudes[-1] + half
+    return {
+        "sourcetype": "image",
+        "source": "data:image/png;base64," + base64.b64encode(png).decode("ascii"),
+        "coordinates": [[west, north], [east, north], [east, south], [west, south]]
+    }
@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from utils.artifacts import artifacts
+from utils.datasets import DailyTable, optimize_dtypes, read_parquet
+from utils.profiling import profiler
+
+
+def load_sjv_pm25_daily():
+    """SJV daily PM 2.5 monitors, preferring the columnar copy made with `python -m utils.datasets`."""
+    try:
+        path = artifacts.path("sjv_pm25", "sjv_pm25_daily_df.parquet")
+        with profiler.span("parse", "sjv_pm25_daily_df.parquet"):
+            df = read_parquet(path)
+    except FileNotFoundError:
+        df = optimize_dtypes(artifacts.read_csv("sjv_pm25", "sjv_pm25_daily_df.csv"))
+    return DailyTable(df)
+
+
+# Everything the pages load at import, by name. Model files are only fetched into the
+# artifact cache here; the forecast page's registry parses them when a county is used.
+STARTUP_ARTIFACTS = {
+    "sjv_pm25_daily": load_sjv_pm25_daily,
+    "pm25_correlation_dfs": lambda: artifacts.read_all_csvs("pm25_correlation_data"),
+    "fresno_sample_df": lambda: artifacts.read_csv("fresno_daily_data", "sampled_fresno_df.csv"),
+    "three_year_predictions": lambda: artifacts.load_numpy("munkh_models_lstm", "three_year_predictions.npy"),
+    "fresno_pm25_lstm_model.h5": lambda: artifacts.path("munkh_models_lstm", "rigorous_fresno_pm25_lstm_model.h5"),
+    "fresno_pm25_last_60_scaled.npy": lambda: artifacts.path("munkh_models_lstm",
+                                                             "rigorous_fresno_pm25_last_60_scaled.npy"),
+    "fresno_pm25_scaler.pkl": lambda: artifacts.path("munkh_models_lstm", "rigorous_fresno_pm25_scaler.pkl"),
+}
+
+
+class Lazy:
+    """A value built by load() on first get(), once, even under concurrent callbacks."""
+
+    def __init__(self, load):
+        self.load = load
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def get(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._value = self.load()
+                    self._loaded = True
+        return self._value
+
+
+class StartupLoader:
+    """Fetches and parses startup artifacts concurrently on a thread pool.
+
+    start() submits every loader at once, before Dash imports the pages, so a
+    cold start waits for the slowest artifact rather than the sum of all of
+    them. Pages hold handle(name) and call get() from their layout functions and
+    callbacks, so nothing blocks the app from booting. A name that was never
+    started, or whose last load failed, is loaded on the pool when next requested.
+    """
+
+    def __init__(self, loaders, max_workers=8):
+        self.loaders = loaders
+        self.max_workers = max_workers
+        self.timings = {}  # name -> seconds spent loading
+        self.errors = {}  # name -> exception of the last failed load
+        self._futures = {}
+        self._executor = None
+        self._started_at = None
+        self._lock = threading.Lock()
+
+    def _run(self, name):
+        start = time.perf_counter()
+        try:
+            with profiler.span("artifact", name):
+                return self.loaders[name]()
+        finally:
+            self.timings[name] = time.perf_counter() - start
+
+    def _submit(self, name):
+        with self._lock:
+            future = self._futures.get(name)
+            if future is not None:
+                return future
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="startup")
+                self._started_at = time.perf_counter()
+            future = self._futures[name] = self._executor.submit(self._run, name)
+        # Outside the lock: the callback runs right away if the load already finished
+        future.add_done_callback(lambda future: self._settle(name, future))
+        return future
+
+    def _settle(self, name, future):
+        """Drops a failed load, so one transient error does not break a page until a restart."""
+        error = future.exception()
+        with self._lock:
+            if error is None:
+                self.errors.pop(name, None)
+                return
+            self.errors[name] = error
+            if self._futures.get(name) is future:
+                del self._futures[name]
+
+    def start(self, names=None):
+        for name in names or self.loaders:
+            self._submit(name)
+
+    def get(self, name):
+        """The loaded artifact, waiting for it if needed; re-raises its loading error."""
+        return self._submit(name).result()
+
+    def handle(self, name):
+        """A Lazy handle to the artifact, for module-level use in pages."""
+        return Lazy(lambda: self.get(name))
+
+    def report_when_done(self, then=None):
+        """Prints the report from a background thread once every started artifact is loaded,
+        then calls then() if given."""
+        with self._lock:
+            futures = list(self._futures.values())
+
+        def report():
+            wait(futures)
+            self.report()
+            if then is not None:
+                then()
+
+        threading.Thread(target=report, name="startup-report", daemon=True).start()
+
+    def report(self):
+        """Prints per-artifact load times and the wall time since start()."""
+        with self._lock:
+            futures = dict(self._futures)
+            errors = {name: e for name, e in self.errors.items() if name not in futures}
+        if not futures and not errors:
+            return
+        for name in sorted(futures.keys() | errors.keys(), key=lambda name: -self.timings.get(name, 0)):
+            future = futures.get(name)
+            status = f"failed ({errors[name]!r})" if future is None else "ok" if future.done() else "loading"
+            print(f"startup {name:32s} {self.timings.get(name, float('nan')):7.2f} s  {status}")
+        done = [name for name, future in futures.items() if future.done()]
+        print(f"startup: {len(done)}/{len(futures) + len(errors)} artifacts, "
+              f"{sum(self.timings.values()):.2f} s of loading in {time.perf_counter() - self._started_at:.2f} s wall")
+
+
+startup = StartupLoader(STARTUP_ARTIFACTS, max_workers=int(os.environ.get("STARTUP_WORKERS", "8")))